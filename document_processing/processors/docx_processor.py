@@ -29,17 +29,23 @@ class DocxProcessor(BaseProcessor):
             # 提取段落文本
             paragraphs = []
             for para in doc.paragraphs:
-                if para.text.strip():
-                    paragraphs.append(para.text)
+                text = para.text  # para.text 每次访问都会重新拼接各run的文本，只取一次
+                if text.strip():
+                    paragraphs.append(text)
             
             # 提取表格文本
             tables = []
             for table in doc.tables:
                 table_text = []
+                # 合并单元格（横向跨列、纵向合并）在 row.cells 中会重复出现，按底层 w:tc 元素缓存其文本
+                cell_texts = {}
                 for row in table.rows:
                     row_text = []
                     for cell in row.cells:
-                        row_text.append(cell.text.strip())
+                        text = cell_texts.get(cell._tc)
+                        if text is None:
+                            text = cell_texts[cell._tc] = cell.text.strip()
+                        row_text.append(text)
                     if any(row_text):  # 只添加非空行
                         table_text.append(' | '.join(row_text))
                 if table_text:
@@ -29,8 +29,8 @@ class PDFProcessor(BaseProcessor):
                     page = reader.pages[page_num]
                     page_text = page.extract_text() or ""  # 防止None
 
-                    # 增强扫描件检测逻辑
-                    if cls._is_scanned_page(page):
+                    # 增强扫描件检测逻辑（复用已提取的文本，不再重复解析页面内容流）
+                    if cls._is_scanned_page(page, page_text):
                         raise DocumentProcessingError(
                             f"检测到扫描件/图像内容（第{page_num + 1}页）"
                         )
@@ -46,12 +46,13 @@ class PDFProcessor(BaseProcessor):
             raise DocumentProcessingError(f"PDF处理失败: {str(e)}")
 
     @staticmethod
-    def _is_scanned_page(page) -> bool:
-        """综合判断是否为扫描页：文本量+图像存在"""
+    def _is_scanned_page(page, text: str = None) -> bool:
+        """综合判断是否为扫描页：文本量+图像存在（text 为已提取的页面文本，未提供时重新提取）"""
         if not HAS_PYPDF2:
             return False
             
-        text = page.extract_text() or ""
+        if text is None:
+            text = page.extract_text() or ""
         if len(text) < 50 and '/XObject' in page['/Resources']:
             return True
         return False
\ No newline at end of file
@@ -238,20 +238,28 @@ class EnhancedAdaptiveSystem:
                 stats['matches'] += 1
 
     def learn_from_feedback(self, text: str, feedback: Dict[str, Any]):
-        """从反馈中学习新的模式和规则"""
+        """从反馈中学习新的模式和规则
+
+        feedback['patterns'] 中的模式可以是正则字符串，也可以是预编译的 re.Pattern，
+        两者在 re.search/re.finditer 中等价使用
+        """
         try:
-            if 'patterns' in feedback:
-                for pattern_type, new_patterns in feedback['patterns'].items():
+            # 每类反馈只查找一次，空反馈直接跳过
+            learned_patterns = feedback.get('patterns')
+            if learned_patterns:
+                for pattern_type, new_patterns in learned_patterns.items():
                     self.patterns[pattern_type].extend(new_patterns)
                     self.logger.info(f"学习了新的{pattern_type}模式: {len(new_patterns)}个")
                     
-            if 'keywords' in feedback:
-                for keyword_type, new_keywords in feedback['keywords'].items():
+            learned_keywords = feedback.get('keywords')
+            if learned_keywords:
+                for keyword_type, new_keywords in learned_keywords.items():
                     self.keywords[keyword_type].update(new_keywords)
                     self.logger.info(f"学习了新的{keyword_type}关键词: {len(new_keywords)}个")
             
-            if 'scene_patterns' in feedback:
-                for scene, patterns in feedback['scene_patterns'].items():
+            scene_patterns = feedback.get('scene_patterns')
+            if scene_patterns:
+                for scene, patterns in scene_patterns.items():
                     if scene not in self.scene_patterns:
                         self.scene_patterns[scene] = {'indicators': [], 'patterns': {}}
                     self.scene_patterns[scene]['indicators'].extend(patterns.get('indicators', []))
@@ -259,8 +267,8 @@ class EnhancedAdaptiveSystem:
                     self.logger.info(f"学习了新的场景模式: {scene}")
             
             # 更新统计信息
-            self.statistics['patterns_learned'] += len(feedback.get('patterns', {}))
-            self.statistics['keywords_learned'] += len(feedback.get('keywords', {}))
+            self.statistics['patterns_learned'] += len(learned_patterns) if learned_patterns else 0
+            self.statistics['keywords_learned'] += len(learned_keywords) if learned_keywords else 0
             
         except Exception as e:
             self.logger.error(f"从反馈中学习失败: {str(e)}")
@@ -5,7 +5,7 @@ import logging
 import uuid
 from information_extraction.schemas import Entity, EntityLabel
 from collections import defaultdict
-from datetime import datetime
+import time
 
 class InformationProcessor:
     """信息处理器"""
@@ -83,7 +83,7 @@ class InformationProcessor:
             
         try:
             self.statistics['total_processed'] += 1
-            start_time = datetime.now()
+            start_time = time.perf_counter()
             
             # 记录处理进度
             if file_info:
@@ -113,7 +113,7 @@ class InformationProcessor:
                 'anomalies': anomalies,
                 'metadata': {
                     'file_info': file_info,
-                    'processing_time': (datetime.now() - start_time).total_seconds()
+                    'processing_time': time.perf_counter() - start_time
                 }
             }
             
@@ -100,4 +100,17 @@ class ProcessedChunk:
     anomalies: Optional[List[Dict]] = None
     qa_pairs: Optional[List[Dict]] = None
     compliance_events: Optional[List[ComplianceEvent]] = None
-    compliance_analysis: Optional[Dict] = None
\ No newline at end of file
+    compliance_analysis: Optional[Dict] = None
+
+    @property
+    def entities_by_label(self) -> Dict[str, List[Entity]]:
+        """按标签分组的实体（每次访问按当前 entities 一次遍历计算，entities 被修改后结果随之变化）"""
+        groups: Dict[str, List[Entity]] = {}
+        for e in self.entities:
+            groups.setdefault(getattr(e, "label", ""), []).append(e)
+        return groups
+
+    @property
+    def label_set(self) -> frozenset:
+        """实体标签集合（每次访问按当前 entities 计算）"""
+        return frozenset(getattr(e, "label", "") for e in self.entities)
\ No newline at end of file
@@ -3,18 +3,29 @@ import os
 import logging
 import pandas as pd
 import json
-from typing import Dict, List, Any, Optional, Union, Generator
+from typing import Dict, List, Any, Optional, Union, Generator, Tuple, Iterable
 import traceback
+import argparse
 import re
+import codecs
+import csv
+import io
+import functools
+import itertools
+import mmap
+import hashlib
+import pickle
 import sys
 import importlib
+import importlib.util
 from datetime import datetime
 from io import StringIO
 import numpy as np
-from collections import defaultdict
+from collections import OrderedDict
 import subprocess
 from pathlib import Path
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from document_processing import DocumentProcessor
 from text_chunking import ChunkManager
 from information_extraction import InformationProcessor, EnhancedAdaptiveSystem
@@ -25,14 +36,20 @@ if project_root not in sys.path:
     sys.path.append(project_root)
 
 # 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('processing.log', mode='w'),
-        logging.StreamHandler()
-    ]
-)
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_FILE = 'processing.log'
+
+# 只在作为脚本运行时配置日志（mode='w' 重新创建日志文件）。进程池以 spawn/forkserver 方式
+# 启动子进程时会重新导入本模块（__name__ 为 __mp_main__ 或模块名），不能再次截断日志文件
+if __name__ == '__main__':
+    logging.basicConfig(
+        level=logging.INFO,
+        format=LOG_FORMAT,
+        handlers=[
+            logging.FileHandler(LOG_FILE, mode='w'),
+            logging.StreamHandler()
+        ]
+    )
 
 # 设置特定模块的日志级别
 logging.getLogger('PIL').setLevel(logging.WARNING)
@@ -113,15 +130,6 @@ def install_module(module_name):
         logging.error(f"{module_name} 模块安装失败: {str(e)}")
         return False
 
-# 检查并安装必要的依赖
-required_modules = {
-    'pandas': 'pandas>=1.3.0',
-    'python-docx': 'python-docx>=0.8.11',
-    'PyPDF2': 'PyPDF2>=2.0.0',
-    'scikit-learn': 'scikit-learn>=0.24.2',
-    'numpy': 'numpy>=1.21.0'
-}
-
 # 尝试导入必要模块，如果失败则进入离线模式
 OFFLINE_MODE = False
 try:
@@ -152,37 +160,27 @@ except ImportError:
     HAS_TORCH = False
     logger.info("PyTorch未安装，将使用CPU处理")
 
-# 检查并安装 python-docx 模块
-HAS_DOCX = not OFFLINE_MODE and is_module_installed('docx')
-if not HAS_DOCX:
-    logger.warning("python-docx 模块未安装，尝试自动安装...")
-    if install_module('python-docx'):
-        HAS_DOCX = True
-        from docx import Document
-    else:
-        logger.warning("python-docx 模块安装失败，Word处理功能将受限")
-else:
+# python-docx 模块（缺失时由 ensure_deps 在命令行入口安装）
+HAS_DOCX = not OFFLINE_MODE and importlib.util.find_spec('docx') is not None
+if HAS_DOCX:
     logger.info("python-docx 模块已安装")
     from docx import Document
-
-# 检查并安装 PyPDF2
-HAS_PYPDF2 = not OFFLINE_MODE and is_module_installed('PyPDF2')
-if not HAS_PYPDF2:
-    logger.warning("PyPDF2 模块未安装，尝试自动安装...")
-    if install_module('PyPDF2'):
-        HAS_PYPDF2 = True
-        import PyPDF2
-    else:
-        logger.warning("PyPDF2 模块未安装，PDF处理功能将受限")
 else:
+    logger.warning("python-docx 模块未安装，Word处理功能将受限")
+
+# PyPDF2 模块（缺失时由 ensure_deps 在命令行入口安装）
+HAS_PYPDF2 = not OFFLINE_MODE and importlib.util.find_spec('PyPDF2') is not None
+if HAS_PYPDF2:
     logger.info("PyPDF2 模块已安装")
     import PyPDF2
+else:
+    logger.warning("PyPDF2 模块未安装，PDF处理功能将受限")
 
 # 不安装spacy，使用离线模式
 HAS_SPACY = False
 logger.info("使用离线模式进行实体识别和文本处理")
 
-# 检查并安装必要的依赖
+# 必要的依赖：pip包名 -> 导入名
 required_modules = {
     'pandas': 'pandas',
     'python-docx': 'docx',
@@ -190,15 +188,27 @@ required_modules = {
     'scikit-learn': 'sklearn'
 }
 
-for module_name, import_name in required_modules.items():
-    if not is_module_installed(import_name):
+
+def ensure_deps() -> bool:
+    """
+    检查并安装缺失的必要依赖。只在命令行入口调用一次，
+    导入本模块（包括进程池子进程）时不会启动pip子进程
+
+    Returns:
+        是否安装了新的依赖
+    """
+    installed = False
+    for module_name, import_name in required_modules.items():
+        if importlib.util.find_spec(import_name) is not None:
+            logger.info(f"{module_name} 模块已安装")
+            continue
         logger.warning(f"{module_name} 模块未安装，尝试自动安装...")
         if install_module(module_name):
             logger.info(f"{module_name} 模块安装成功")
+            installed = True
         else:
             logger.warning(f"{module_name} 模块安装失败，部分功能可能受限")
-    else:
-        logger.info(f"{module_name} 模块已安装")
+    return installed
 
 # 尝试导入其他模块，如果导入失败则提供替代方案
 try:
@@ -231,79 +241,356 @@ except ImportError:
     logger.warning("场景适配模块导入失败，部分功能将受限")
 
 
-def detect_file_encoding(file_path: str) -> str:
-    """检测文件编码"""
-    encodings = ['utf-8', 'gbk', 'gb2312', 'iso-8859-1', 'ascii']
-    
-    for encoding in encodings:
+# 编码检测库：优先使用C实现的cchardet，其次charset_normalizer/chardet（接口相同）
+try:
+    import cchardet as charset_detector
+    HAS_CHARSET_DETECTOR = True
+except ImportError:
+    try:
+        import charset_normalizer as charset_detector
+        HAS_CHARSET_DETECTOR = True
+    except ImportError:
         try:
-            with open(file_path, 'r', encoding=encoding) as f:
-                f.read(100)  # 尝试读取前100个字符
-                return encoding
-        except UnicodeDecodeError:
-            continue
-    
-    # 如果所有编码都失败，默认返回utf-8
-    return 'utf-8'
+            import chardet as charset_detector
+            HAS_CHARSET_DETECTOR = True
+        except ImportError:
+            HAS_CHARSET_DETECTOR = False
+            logger.info("未安装编码检测库，将使用逐一尝试解码的方式检测编码")
+
+ENCODING_SAMPLE_SIZE = 64 * 1024  # 编码检测读取的样本大小
+
+
+def _can_decode(raw: bytes, encoding: str, final: bool) -> bool:
+    """判断样本能否按指定编码解码（final为False时允许末尾截断的多字节字符）"""
+    try:
+        codecs.getincrementaldecoder(encoding)().decode(raw, final=final)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def detect_file_encoding(file_path: str) -> str:
+    """检测文件编码（按路径、修改时间和大小缓存，同一文件不会重复检测）"""
+    stat = os.stat(file_path)
+    return _detect_file_encoding_cached(file_path, stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=1024)
+def _detect_file_encoding_cached(file_path: str, mtime_ns: int, size: int) -> str:
+    """实际的编码检测，mtime_ns/size 仅作为缓存键，文件变化后自动重新检测"""
+    # 只读取一次文件头部样本，之后全部在内存中判断
+    with open(file_path, 'rb') as f:
+        raw = f.read(ENCODING_SAMPLE_SIZE)
+    final = len(raw) < ENCODING_SAMPLE_SIZE  # 样本已包含整个文件
+
+    # 带BOM的文件直接由BOM确定编码（utf-8-sig 解码时会去掉BOM，避免其混入首个列名或首行文本）
+    if raw.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if raw.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+
+    # UTF-8（含ASCII）最常见，严格解码即可可靠判定
+    if _can_decode(raw, 'utf-8', final):
+        return 'utf-8'
+
+    if HAS_CHARSET_DETECTOR:
+        encoding = (charset_detector.detect(raw) or {}).get('encoding')
+        if encoding:
+            encoding = encoding.lower()
+            # GB2312/GBK 检测结果统一使用其超集，避免遇到生僻字时解码失败
+            if encoding in ('gb2312', 'gbk'):
+                return 'gb18030'
+            return encoding
+
+    for encoding in ('gbk', 'gb2312'):
+        if _can_decode(raw, encoding, final):
+            return encoding
+
+    # iso-8859-1 可以解码任意字节
+    return 'iso-8859-1'
 
 
 def chunk_large_file(file_path: str, chunk_size: int = 1024 * 1024) -> Generator[str, None, None]:
-    """分块读取大文件"""
+    """分块读取大文件（chunk_size 为每次读取的字节数）"""
     encoding = detect_file_encoding(file_path)
-    with open(file_path, 'r', encoding=encoding) as file:
-        while True:
-            chunk = file.read(chunk_size)
-            if not chunk:
-                break
-            yield chunk
-
-
-def extract_advanced_keywords(text: str) -> Dict[str, List[str]]:
-    """增强的关键词提取"""
-    keywords = defaultdict(list)
-
-    # 使用更复杂的模式匹配
-    patterns = {
-        'banks': [
-            r"([A-Za-z\s]+(?:Bank|Financial|Credit Union))",
-            r"([\u4e00-\u9fa5]+(?:银行|信用社|金融))",
-        ],
-        'companies': [
-            r"([A-Z][a-z]+(?:\s[A-Z][a-z]+)*\s(?:Inc|Corp|Ltd|LLC|Company|Group))",
-            r"([\u4e00-\u9fa5]+(?:公司|集团|企业|有限责任|股份))",
-        ],
-        'dates': [
-            r"(\d{4}(?:/\d{1,2}){2})",
-            r"(\d{4}年\d{1,2}月\d{1,2}日)",
-            r"(\d{1,2}/\d{1,2}/\d{4})",
-            r"(\d{4}-\d{2}-\d{2})",
-        ],
-        'amounts': [
-            r"(\d+(?:\.\d+)?)\s*(?:亿|万|元|美元|USD|CNY|RMB|€|₤|¥)",
-            r"(?:USD|CNY|RMB|€|₤|¥)\s*(\d+(?:\.\d+)?)",
-        ],
-        'locations': [
-            r"([\u4e00-\u9fa5]{2,}(?:省|市|区|县|镇))",
-            r"([A-Z][a-z]+(?:\s[A-Z][a-z]+)*(?:\s+City)?)",
-        ],
-        'emails': [
-            r"([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})",
-        ],
-        'phones': [
-            r"(\+?\d{1,3}[-.\s]?\d{3}[-.\s]?\d{3}[-.\s]?\d{4})",
-            r"(\d{3,4}[-\s]?\d{3,4}[-\s]?\d{4})",
-        ],
-    }
+    # 以二进制方式读取并增量解码：跨块截断的多字节字符由解码器暂存，换行符与文本模式一样统一为\n
+    decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder(encoding)(), translate=True)
+    with open(file_path, 'rb', buffering=0) as file:
+        try:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return  # 空文件无法映射，也没有内容可读
+        except OSError:
+            mapped = None  # 不支持映射的文件（如管道）退回逐块读取
+
+        if mapped is None:
+            while True:
+                raw = file.read(chunk_size)
+                chunk = decoder.decode(raw, final=not raw)
+                if chunk:
+                    yield chunk
+                if not raw:
+                    break
+            return
+
+        # 内存映射后直接把切片视图交给解码器，数据由内核按页读入，无需先复制到Python字节串
+        with mapped:
+            if hasattr(mapped, 'madvise'):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            view = memoryview(mapped)
+            try:
+                size = len(view)
+                for start in range(0, size, chunk_size):
+                    chunk = decoder.decode(view[start:start + chunk_size], final=start + chunk_size >= size)
+                    if chunk:
+                        yield chunk
+            finally:
+                view.release()
+
+
+# 关键词提取模式
+_KEYWORD_SOURCES = {
+    'banks': (
+        r"([A-Za-z\s]+(?:Bank|Financial|Credit Union))",
+        r"([\u4e00-\u9fa5]+(?:银行|信用社|金融))",
+    ),
+    'companies': (
+        r"([A-Z][a-z]+(?:\s[A-Z][a-z]+)*\s(?:Inc|Corp|Ltd|LLC|Company|Group))",
+        r"([\u4e00-\u9fa5]+(?:公司|集团|企业|有限责任|股份))",
+    ),
+    'dates': (
+        r"(\d{4}(?:/\d{1,2}){2})",
+        r"(\d{4}年\d{1,2}月\d{1,2}日)",
+        r"(\d{1,2}/\d{1,2}/\d{4})",
+        r"(\d{4}-\d{2}-\d{2})",
+    ),
+    'amounts': (
+        r"(\d+(?:\.\d+)?)\s*(?:亿|万|元|美元|USD|CNY|RMB|€|₤|¥)",
+        r"(?:USD|CNY|RMB|€|₤|¥)\s*(\d+(?:\.\d+)?)",
+    ),
+    'locations': (
+        r"([\u4e00-\u9fa5]{2,}(?:省|市|区|县|镇))",
+        r"([A-Z][a-z]+(?:\s[A-Z][a-z]+)*(?:\s+City)?)",
+    ),
+    'emails': (
+        r"([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})",
+    ),
+    'phones': (
+        r"(\+?\d{1,3}[-.\s]?\d{3}[-.\s]?\d{3}[-.\s]?\d{4})",
+        r"(\d{3,4}[-\s]?\d{3,4}[-\s]?\d{4})",
+    ),
+}
+
+# 同一类别的多个模式合并为一个交替模式，每个类别只扫描文本一次。
+# 合并后的 finditer 只返回互不重叠的匹配：同一位置按模式顺序取第一个能匹配的分支，
+# 与已有匹配重叠的其他分支的匹配不再返回（分别扫描时它们会被找到），结果按文本中出现的顺序排列。
+# 不同类别之间的模式重叠更多（例如地名模式会吞掉邮箱的用户名部分），因此只在类别内合并。
+_KEYWORD_PATTERNS = {
+    category: re.compile('|'.join(sources))
+    for category, sources in _KEYWORD_SOURCES.items()
+}
+
+
+def _requires_cjk(source: str) -> bool:
+    """模式是否必须包含汉字才能匹配（以汉字串开头，或包含“年”等汉字字面量）"""
+    return source.startswith(r"([\u4e00-\u9fa5]") or '年' in source
+
+
+# 不含汉字的文本（英文文档等）使用去掉中文分支的模式：这些分支不可能匹配，去掉后结果不变
+_CJK_CHAR_RE = re.compile(r'[\u4e00-\u9fa5]')
+_NON_CJK_KEYWORD_PATTERNS = {
+    category: re.compile('|'.join(source for source in sources if not _requires_cjk(source)))
+    for category, sources in _KEYWORD_SOURCES.items()
+}
+
+
+# 可选：pyahocorasick（Aho-Corasick自动机），一次线性扫描同时匹配词典中的全部名称
+try:
+    import ahocorasick
+    HAS_AHOCORASICK = True
+except ImportError:
+    HAS_AHOCORASICK = False
+
+# 各关键词类别注册的名称词典匹配器（由 set_keyword_lexicon 构建）
+_KEYWORD_LEXICONS: Dict[str, Any] = {}
+
+
+def set_keyword_lexicon(category: str, names: Iterable[str]) -> None:
+    """
+    为关键词类别（如 banks、companies）注册已知名称词典，
+    extract_advanced_keywords 会在正则匹配之外补充词典中出现的名称；传入空词典即取消注册
+    """
+    if category not in _KEYWORD_PATTERNS:
+        raise ValueError(f"未知的关键词类别: {category}")
+
+    # 词典变化会改变关键词结果，清空按内容缓存的文本分析结果
+    _TEXT_ANALYSIS_CACHE.clear()
+
+    # 长名称优先，保证正则回退方案与自动机的最长匹配结果一致
+    names = sorted({name.strip() for name in names if name and name.strip()}, key=len, reverse=True)
+    if not names:
+        _KEYWORD_LEXICONS.pop(category, None)
+        return
+
+    if HAS_AHOCORASICK:
+        automaton = ahocorasick.Automaton()
+        for name in names:
+            automaton.add_word(name, name)
+        automaton.make_automaton()
+        _KEYWORD_LEXICONS[category] = automaton
+    else:
+        _KEYWORD_LEXICONS[category] = re.compile('|'.join(map(re.escape, names)))
+
+
+def _iter_lexicon_matches(matcher, text: str) -> Generator[str, None, None]:
+    """产出词典在文本中的匹配（最长且互不重叠）"""
+    if isinstance(matcher, re.Pattern):
+        for match in matcher.finditer(text):
+            yield match.group()
+    else:
+        for _, name in matcher.iter_long(text):
+            yield name
+
+
+def extract_advanced_keywords(text: str, categories: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+    """增强的关键词提取（categories 可限定只提取部分类别，未知类别抛出 ValueError）"""
+    if categories is not None:
+        categories = set(categories)
+        unknown = categories.difference(_KEYWORD_PATTERNS)
+        if unknown:
+            raise ValueError(f"未知的关键词类别: {', '.join(sorted(unknown))}")
+
+    keywords = {}
+    # Hyperscan 一次扫描预判可能命中的类别，其余类别无需再用正则逐一扫描
+    candidates = set(_keyword_candidate_categories(text))
+    patterns = _KEYWORD_PATTERNS if _CJK_CHAR_RE.search(text) else _NON_CJK_KEYWORD_PATTERNS
+
+    for category, pattern in patterns.items():
+        if categories is not None and category not in categories:
+            continue
+        # 每个子模式只有一个捕获组，命中分支的捕获组即最后匹配的组；dict.fromkeys 按出现顺序去重
+        values = dict.fromkeys(
+            value for match in pattern.finditer(text)
+            if (value := match.group(match.lastindex).strip())
+        ) if category in candidates else {}
+        lexicon = _KEYWORD_LEXICONS.get(category)
+        if lexicon is not None:
+            values.update(dict.fromkeys(_iter_lexicon_matches(lexicon, text)))
+        if values:
+            keywords[category] = list(values)
+
+    return keywords
+
+
+# 文档结构识别模式（模块加载时编译一次）
+_PARA_SPLIT_RE = re.compile(r'\n\s*\n')  # 段落分隔（空行）
+_SECTION_RE = re.compile(r'^(?:第[一二三四五六七八九十]+[章节]|[IVX]+\.|[\d]+\.)\s*(.+)$', re.MULTILINE)
+_LIST_RE = re.compile(r'(?:^[\d]+\.|^[-•*]\s+)(.+)$', re.MULTILINE)
+_TABLE_RE = re.compile(r'[|｜].+[|｜]')
+
+# 可选：Hyperscan 多模式匹配库，一次扫描即可同时判定章节/列表/表格
+try:
+    import hyperscan
+    HAS_HYPERSCAN = True
+except ImportError:
+    HAS_HYPERSCAN = False
+
+
+def _build_structure_database():
+    """将章节/列表/表格模式编译为一个Hyperscan数据库，编译失败时返回None"""
+    if not HAS_HYPERSCAN:
+        return None
+    try:
+        base_flags = hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP | hyperscan.HS_FLAG_SOM_LEFTMOST
+        database = hyperscan.Database()
+        database.compile(
+            expressions=[regex.pattern.encode('utf-8') for regex in (_SECTION_RE, _LIST_RE, _TABLE_RE)],
+            ids=[0, 1, 2],
+            elements=3,
+            flags=[
+                base_flags | hyperscan.HS_FLAG_MULTILINE,
+                base_flags | hyperscan.HS_FLAG_MULTILINE,
+                base_flags,
+            ],
+        )
+        return database
+    except Exception as e:
+        logger.warning(f"Hyperscan 数据库编译失败，使用正则表达式识别文档结构: {str(e)}")
+        return None
+
+
+_STRUCTURE_DB = _build_structure_database()
+
+
+def _build_keyword_database():
+    """
+    将各关键词类别的模式编译为一个Hyperscan预过滤数据库（模式ID即类别序号），编译失败时返回None。
+    Hyperscan 不支持捕获组提取，这里只用一次线性扫描判定哪些类别可能命中，具体取值仍由正则完成
+    """
+    if not HAS_HYPERSCAN:
+        return None
+    try:
+        # PREFILTER 保证不漏报（可能多报），SINGLEMATCH 使每个模式只回调一次
+        flags = (hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP
+                 | hyperscan.HS_FLAG_PREFILTER | hyperscan.HS_FLAG_SINGLEMATCH)
+        expressions, ids = [], []
+        for category_id, sources in enumerate(_KEYWORD_SOURCES.values()):
+            for source in sources:
+                # Hyperscan 不识别 \uXXXX 转义，改写为 \x{XXXX}
+                expressions.append(re.sub(r'\\u([0-9a-fA-F]{4})', r'\\x{\1}', source).encode('utf-8'))
+                ids.append(category_id)
+        database = hyperscan.Database()
+        database.compile(expressions=expressions, ids=ids, elements=len(expressions),
+                         flags=[flags] * len(expressions))
+        return database
+    except Exception as e:
+        logger.warning(f"Hyperscan 关键词数据库编译失败，逐类别使用正则表达式扫描: {str(e)}")
+        return None
 
-    for category, pattern_list in patterns.items():
-        for pattern in pattern_list:
-            matches = re.finditer(pattern, text)
-            for match in matches:
-                value = match.group(1).strip()
-                if value and value not in keywords[category]:
-                    keywords[category].append(value)
 
-    return dict(keywords)
+_KEYWORD_DB = _build_keyword_database()
+_KEYWORD_CATEGORIES = tuple(_KEYWORD_PATTERNS)
+
+
+def _keyword_candidate_categories(text: str) -> Iterable[str]:
+    """返回可能包含关键词的类别（按 _KEYWORD_PATTERNS 的顺序），无Hyperscan时返回全部类别"""
+    if _KEYWORD_DB is None:
+        return _KEYWORD_CATEGORIES
+
+    hits = [False] * len(_KEYWORD_CATEGORIES)
+
+    def on_match(category_id, start, end, flags, context):
+        hits[category_id] = True
+
+    _KEYWORD_DB.scan(text.encode('utf-8'), match_event_handler=on_match)
+    return [category for category, hit in zip(_KEYWORD_CATEGORIES, hits) if hit]
+
+
+def _classify_paragraph(para: str) -> Tuple[bool, bool, bool]:
+    """判断段落是否为章节标题、列表项、表格行（与 re.match 语义一致，只接受从段落开头的匹配）"""
+    # 三个模式都锚定在段落开头，先按首字符排除不可能匹配的段落（\d 与 str.isdecimal 同为Unicode Nd类）
+    first = para[:1]
+    maybe_section = first == '第' or (first != '' and first in 'IVX') or first.isdecimal()
+    maybe_list = first.isdecimal() or (first != '' and first in '-•*')
+    maybe_table = first != '' and first in '|｜'
+    if not (maybe_section or maybe_list or maybe_table):
+        return False, False, False
+
+    if _STRUCTURE_DB is not None:
+        hits = [False, False, False]
+
+        def on_match(pattern_id, start, end, flags, context):
+            if start == 0:
+                hits[pattern_id] = True
+
+        _STRUCTURE_DB.scan(para.encode('utf-8'), match_event_handler=on_match)
+        return hits[0], hits[1], hits[2]
+
+    return (
+        maybe_section and _SECTION_RE.match(para) is not None,
+        maybe_list and _LIST_RE.match(para) is not None,
+        maybe_table and _TABLE_RE.match(para) is not None,
+    )
 
 
 def extract_document_structure(content: str) -> Dict[str, Any]:
@@ -316,20 +603,21 @@ def extract_document_structure(content: str) -> Dict[str, Any]:
     }
 
     # 分析段落
-    paragraphs = [p.strip() for p in re.split(r'\n\s*\n', content) if p.strip()]
+    paragraphs = [para for p in _PARA_SPLIT_RE.split(content) if (para := p.strip())]
     structure['paragraphs'] = paragraphs
 
+    # 每个段落只分类一次
+    classes = [_classify_paragraph(para) for para in paragraphs]
+
     # 识别章节
-    section_pattern = r'^(?:第[一二三四五六七八九十]+[章节]|[IVX]+\.|[\d]+\.)\s*(.+)$'
-    for para in paragraphs:
-        if re.match(section_pattern, para, re.MULTILINE):
+    for para, (is_section, _, _) in zip(paragraphs, classes):
+        if is_section:
             structure['sections'].append(para)
 
     # 识别列表
-    list_pattern = r'(?:^[\d]+\.|^[-•*]\s+)(.+)$'
     current_list = []
-    for para in paragraphs:
-        if re.match(list_pattern, para, re.MULTILINE):
+    for para, (_, is_list, _) in zip(paragraphs, classes):
+        if is_list:
             current_list.append(para)
         elif current_list:
             if len(current_list) > 1:
@@ -337,10 +625,9 @@ def extract_document_structure(content: str) -> Dict[str, Any]:
             current_list = []
 
     # 识别表格（简单表格）
-    table_pattern = r'[|｜].+[|｜]'
     current_table = []
-    for para in paragraphs:
-        if re.match(table_pattern, para):
+    for para, (_, _, is_table) in zip(paragraphs, classes):
+        if is_table:
             current_table.append(para)
         elif current_table:
             if len(current_table) > 1:
@@ -350,89 +637,249 @@ def extract_document_structure(content: str) -> Dict[str, Any]:
     return structure
 
 
-def process_csv_file(file_path: str) -> Dict[str, Any]:
-    """增强的CSV文件处理"""
+TEXT_ANALYSIS_CACHE_SIZE = 256  # 进程内按文本内容缓存的关键词/结构分析结果数量
+_TEXT_ANALYSIS_CACHE: "OrderedDict[bytes, Tuple[Dict[str, List[str]], Dict[str, Any]]]" = OrderedDict()
+
+
+def analyze_text(text: str) -> Tuple[Dict[str, List[str]], Dict[str, Any]]:
+    """
+    提取文本的关键词和文档结构，按文本内容指纹缓存结果，重复处理相同文本时直接复用。
+    返回的对象在多次调用间共享，调用方不应修改
+    """
+    key = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+    cached = _TEXT_ANALYSIS_CACHE.get(key)
+    if cached is not None:
+        _TEXT_ANALYSIS_CACHE.move_to_end(key)
+        return cached
+
+    result = (extract_advanced_keywords(text), extract_document_structure(text))
+    _TEXT_ANALYSIS_CACHE[key] = result
+    if len(_TEXT_ANALYSIS_CACHE) > TEXT_ANALYSIS_CACHE_SIZE:
+        _TEXT_ANALYSIS_CACHE.popitem(last=False)
+    return result
+
+
+# CSV列类型识别：候选日期格式，以及用于快速排除非日期列的前缀模式
+_DATE_FORMATS = (
+    '%Y-%m-%d',
+    '%Y/%m/%d',
+    '%d/%m/%Y',
+    '%m/%d/%Y',
+    '%Y%m%d',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y/%m/%d %H:%M:%S'
+)
+_MAYBE_DATE_RE = re.compile(r'^\s*(?:\d{1,4}[-/年.]\d{1,2}|\d{8})')
+
+# pyarrow 提供多线程的列式CSV解析器，可用时作为 read_csv 的解析引擎
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+CSV_ENGINE = 'pyarrow' if HAS_PYARROW else 'c'
+
+# 已识别的CSV分隔符：(路径, 修改时间, 大小, 编码) -> 分隔符
+_CSV_SEPARATOR_CACHE: Dict[tuple, str] = {}
+
+
+CSV_SEPARATORS = (',', ';', '\t', '|')
+CSV_SNIFF_SIZE = 8192  # 分隔符嗅探读取的字符数
+
+
+def _sniff_csv_separators(file_path: str, encoding: str) -> List[str]:
+    """根据文件开头的样本推断分隔符，返回按可能性排序的候选分隔符列表"""
+    try:
+        with open(file_path, 'r', encoding=encoding, errors='replace', newline='') as f:
+            sample = f.read(CSV_SNIFF_SIZE)
+        if len(sample) == CSV_SNIFF_SIZE and '\n' in sample:
+            sample = sample[:sample.rindex('\n')]  # 丢弃被截断的最后一行
+        sniffed = csv.Sniffer().sniff(sample, delimiters=''.join(CSV_SEPARATORS)).delimiter
+    except (csv.Error, OSError):
+        return list(CSV_SEPARATORS)
+    return [sniffed] + [sep for sep in CSV_SEPARATORS if sep != sniffed]
+
+
+CSV_CHUNK_ROWS = 50_000  # 只做统计时每次读取的行数
+
+
+def _classify_csv_column(series: pd.Series) -> str:
+    """识别CSV列的类型：date / numeric_string / text，其余按pandas的dtype名称"""
+    if series.dtype == 'object':
+        # 先用廉价的前缀匹配抽样预筛，明显不是日期的列（名称、邮箱、编号等）跳过完整解析
+        sample = series.dropna().astype(str).head(200)
+        maybe_date = len(sample) > 0 and sample.str.match(_MAYBE_DATE_RE).mean() >= 0.5
+
+        # 尝试转换为日期，支持多种日期格式：
+        # 候选格式先在抽样上试解析，只有抽样全部成功的格式才对整列做一次不抛异常的解析
+        if maybe_date:
+            non_null = len(series) - int(series.isna().sum())
+            for date_format in _DATE_FORMATS:
+                if not pd.to_datetime(sample, format=date_format, errors='coerce').notna().all():
+                    continue
+                parsed = pd.to_datetime(series, format=date_format, errors='coerce')
+                if int(parsed.notna().sum()) == non_null:
+                    return 'date'
+
+        # 检查是否是数值（带有货币符号等）
+        try:
+            if series.str.contains(r'[\d]+').all():
+                return 'numeric_string'
+            return 'text'
+        except:
+            return 'text'
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        # pyarrow 引擎会直接把ISO格式的日期列解析为时间类型
+        return 'date'
+    return str(series.dtype)
+
+
+def _merge_csv_column_types(types: List[str]) -> str:
+    """合并同一列在各分块上识别出的类型"""
+    unique = set(types)
+    if len(unique) == 1:
+        return types[0]
+    try:
+        # 数值列在不同分块上可能分别推断为 int64/float64 等，取能容纳全部分块的类型
+        dtypes = [np.dtype(t) for t in unique]
+        if all(np.issubdtype(t, np.number) for t in dtypes):
+            return str(np.result_type(*dtypes))
+    except TypeError:
+        pass
+    # 日期值本身也都含有数字
+    if unique <= {'date', 'numeric_string'}:
+        return 'numeric_string'
+    return 'text'
+
+
+def _summarize_csv_chunks(chunks) -> Dict[str, Any]:
+    """逐块累计CSV的行数、缺失值、唯一值和列类型，内存占用与分块大小而非文件大小相关"""
+    columns: List[str] = []
+    row_count = 0
+    missing: Dict[str, int] = {}
+    uniques: Dict[str, set] = {}
+    chunk_types: Dict[str, List[str]] = {}
+    for chunk in chunks:
+        if not columns:
+            columns = chunk.columns.tolist()
+            missing = dict.fromkeys(columns, 0)
+            uniques = {col: set() for col in columns}
+            chunk_types = {col: [] for col in columns}
+        row_count += len(chunk)
+        for col, n in chunk.isna().sum().items():
+            missing[col] += int(n)
+        for col in columns:
+            uniques[col].update(chunk[col].dropna().unique().tolist())
+            chunk_types[col].append(_classify_csv_column(chunk[col]))
+    column_types = {col: _merge_csv_column_types(types) for col, types in chunk_types.items()}
+    return {
+        'columns': columns,
+        'column_types': column_types,
+        'row_count': row_count,
+        'statistics': {
+            'missing_values': missing,
+            'unique_values': {col: len(values) for col, values in uniques.items()},
+            'numeric_columns': [col for col, col_type in column_types.items() if _is_numeric_type_name(col_type)]
+        }
+    }
+
+
+def _is_numeric_type_name(type_name: str) -> bool:
+    """判断 _classify_csv_column 给出的类型名是否为数值dtype（不含布尔）"""
+    try:
+        dtype = np.dtype(type_name)
+    except TypeError:
+        return False
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+
+def process_csv_file(file_path: str, file_size: Optional[int] = None,
+                     include_data: bool = True, columnar: bool = False) -> Dict[str, Any]:
+    """
+    增强的CSV文件处理（file_size 可由调用方传入已缓存的文件大小）
+
+    'data' 默认为逐行的记录字典列表；columnar 为 True 时改为按列存储的 {列名: [值...]}，
+    免去为每行构建字典，需要逐行访问时可用 iter_csv_records（两种形式都支持）。
+    include_data 为 False 时不输出 'data'，按 CSV_CHUNK_ROWS 分块读取并累计统计信息，
+    适用于只需要列信息和统计结果的大文件
+    """
     try:
         logger.info(f"处理CSV文件: {file_path}")
 
+        # 只stat一次，编码检测缓存、分隔符缓存和文件大小共用
+        stat = os.stat(file_path)
+
         # 检测文件编码
-        encoding = detect_file_encoding(file_path)
+        encoding = _detect_file_encoding_cached(file_path, stat.st_mtime_ns, stat.st_size)
         logger.info(f"检测到文件编码: {encoding}")
 
-        # 尝试不同的分隔符
-        separators = [',', ';', '\t', '|']
+        # 尝试不同的分隔符（同一文件已识别过的分隔符直接使用）
+        sep_cache_key = (file_path, stat.st_mtime_ns, stat.st_size, encoding)
+        cached_sep = _CSV_SEPARATOR_CACHE.get(sep_cache_key)
+        separators = [cached_sep] if cached_sep else _sniff_csv_separators(file_path, encoding)
         df = None
+        first_chunk = None
         used_sep = None
 
         for sep in separators:
             try:
-                df = pd.read_csv(file_path, encoding=encoding, sep=sep)
+                if include_data:
+                    df = pd.read_csv(file_path, encoding=encoding, sep=sep, engine=CSV_ENGINE)
+                else:
+                    # pyarrow 引擎不支持分块读取
+                    reader = pd.read_csv(file_path, encoding=encoding, sep=sep, chunksize=CSV_CHUNK_ROWS)
+                    first_chunk = next(reader, None)
+                    if first_chunk is None:
+                        raise ValueError("CSV文件为空")
                 used_sep = sep
                 break
             except:
                 continue
 
-        if df is None:
+        if used_sep is None:
             raise ValueError("无法识别CSV文件格式")
+        _CSV_SEPARATOR_CACHE[sep_cache_key] = used_sep
+
+        metadata = {
+            'file_path': str(file_path),  # 转换为字符串
+            'file_type': '.csv',
+            'encoding': encoding,
+            'separator': used_sep,
+            'file_size': file_size if file_size is not None else stat.st_size,
+            'processed_time': datetime.now().isoformat()
+        }
 
-        # 数据清洗和预处理
-        df = df.replace(['', 'null', 'NULL', 'NaN', 'nan'], np.nan)
+        if not include_data:
+            summary = _summarize_csv_chunks(itertools.chain([first_chunk], reader))
+            return {
+                'type': 'tabular_data',
+                'columns': summary['columns'],
+                'column_types': summary['column_types'],
+                'row_count': summary['row_count'],
+                'metadata': metadata,
+                'statistics': summary['statistics']
+            }
+
+        # 空串及 null/NULL/NaN/nan 已由 read_csv 的默认缺失值规则解析为NaN，无需再复制一遍数据框替换
 
         # 识别列类型
-        column_types = {}
-        for col in df.columns:
-            if df[col].dtype == 'object':
-                # 尝试转换为日期，支持多种日期格式
-                date_formats = [
-                    '%Y-%m-%d',
-                    '%Y/%m/%d',
-                    '%d/%m/%Y',
-                    '%m/%d/%Y',
-                    '%Y%m%d',
-                    '%Y-%m-%d %H:%M:%S',
-                    '%Y/%m/%d %H:%M:%S'
-                ]
-                is_date = False
-                for date_format in date_formats:
-                    try:
-                        pd.to_datetime(df[col], format=date_format, errors='raise')
-                        column_types[col] = 'date'
-                        is_date = True
-                        break
-                    except:
-                        continue
-
-                if not is_date:
-                    # 检查是否是数值（带有货币符号等）
-                    try:
-                        if df[col].str.contains(r'[\d]+').all():
-                            column_types[col] = 'numeric_string'
-                        else:
-                            column_types[col] = 'text'
-                    except:
-                        column_types[col] = 'text'
-            else:
-                column_types[col] = str(df[col].dtype)
+        column_types = {col: _classify_csv_column(df[col]) for col in df.columns}
 
         # 构建结构化数据
         structured_data = {
             'type': 'tabular_data',
-            'data': df.to_dict(orient='records'),
+            'data': {col: df[col].tolist() for col in df.columns} if columnar else df.to_dict(orient='records'),
             'columns': df.columns.tolist(),
             'column_types': column_types,
             'row_count': len(df),
-            'metadata': {
-                'file_path': str(file_path),  # 转换为字符串
-                'file_type': '.csv',
-                'encoding': encoding,
-                'separator': used_sep,
-                'file_size': os.path.getsize(file_path),
-                'processed_time': datetime.now().isoformat()
-            },
+            'metadata': metadata,
             'statistics': {
-                'missing_values': df.isnull().sum().to_dict(),
-                'unique_values': {col: int(df[col].nunique()) for col in df.columns},  # 转换为整数
-                'numeric_columns': df.select_dtypes(include=[np.number]).columns.tolist()
+                'missing_values': df.isna().sum().to_dict(),
+                'unique_values': {col: int(n) for col, n in df.nunique().items()},  # 单次按列统计，转换为整数
+                'numeric_columns': [
+                    col for col, dtype in df.dtypes.items()
+                    if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+                ]
             }
         }
 
@@ -443,8 +890,71 @@ def process_csv_file(file_path: str) -> Dict[str, Any]:
         return None
 
 
-def extract_text_from_docx(file_path: str) -> Dict[str, Any]:
-    """增强的Word文档文本提取"""
+def iter_csv_records(structured_data: Dict[str, Any]) -> Generator[Dict[str, Any], None, None]:
+    """按行惰性产出 process_csv_file 结果中的记录字典（'data' 为记录列表或列式数据均可）"""
+    columns = structured_data['columns']
+    data = structured_data['data']
+    if isinstance(data, list):
+        yield from data
+        return
+    for values in zip(*(data[col] for col in columns)):
+        yield dict(zip(columns, values))
+
+
+# Word文档底层XML的预编译XPath（python-docx 依赖 lxml，直接遍历XML树可绕开逐属性的描述符开销）
+if HAS_DOCX:
+    from lxml import etree
+    from docx.shared import Twips
+    from docx.enum.style import WD_STYLE_TYPE
+
+    _W_NS = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
+    _DOCX_PARAGRAPHS = etree.XPath('./w:p', namespaces=_W_NS)
+    _DOCX_TABLES = etree.XPath('./w:tbl', namespaces=_W_NS)
+    _DOCX_ROWS = etree.XPath('./w:tr', namespaces=_W_NS)
+    _DOCX_CELLS = etree.XPath('./w:tc', namespaces=_W_NS)
+    # 段落直接包含的 run（含超链接中的 run）的内容元素，与 python-docx 的 paragraph.text 取值范围相同
+    _DOCX_RUN_CONTENT = etree.XPath('./w:r/* | ./w:hyperlink/w:r/*', namespaces=_W_NS)
+    _DOCX_P_STYLE = etree.XPath('string(./w:pPr/w:pStyle/@w:val)', namespaces=_W_NS)
+    _DOCX_P_ALIGN = etree.XPath('string(./w:pPr/w:jc/@w:val)', namespaces=_W_NS)
+    _DOCX_P_IND = etree.XPath('./w:pPr/w:ind', namespaces=_W_NS)
+    _DOCX_GRID_SPAN = etree.XPath('string(./w:tcPr/w:gridSpan/@w:val)', namespaces=_W_NS)
+    _W_T = '{%s}t' % _W_NS['w']
+    _W_BR = '{%s}br' % _W_NS['w']
+    _W_BR_TYPE = '{%s}type' % _W_NS['w']
+    # 其余 run 内容元素对应的文本（与 python-docx 一致），未列出的元素（如 w:rPr）不产生文本
+    _DOCX_RUN_CHARS = {'{%s}%s' % (_W_NS['w'], tag): char
+                       for tag, char in (('tab', '\t'), ('ptab', '\t'), ('cr', '\n'), ('noBreakHyphen', '-'))}
+
+
+def _docx_paragraph_text(p_el) -> str:
+    """段落文本，与 python-docx 的 paragraph.text 相同：w:tab 转为制表符，换行的 w:br 和 w:cr 转为换行符"""
+    parts = []
+    for el in _DOCX_RUN_CONTENT(p_el):
+        tag = el.tag
+        if tag == _W_T:
+            parts.append(el.text or '')
+        elif tag == _W_BR:
+            # 分页符和分栏符不产生文本
+            if el.get(_W_BR_TYPE, 'textWrapping') == 'textWrapping':
+                parts.append('\n')
+        else:
+            parts.append(_DOCX_RUN_CHARS.get(tag, ''))
+    return ''.join(parts)
+
+
+def _docx_indent(ind_el, *attrs: str) -> Optional[int]:
+    """读取w:ind上的缩进属性（twips），按python-docx的约定转换为EMU长度"""
+    if ind_el is None:
+        return None
+    for attr in attrs:
+        value = ind_el.get('{%s}%s' % (_W_NS['w'], attr))
+        if value is not None:
+            return Twips(int(value))
+    return None
+
+
+def extract_text_from_docx(file_path: str, include_formatting: bool = False) -> Dict[str, Any]:
+    """增强的Word文档文本提取（include_formatting 为True时附带段落对齐和缩进信息）"""
     if not HAS_DOCX:
         return None
 
@@ -457,48 +967,50 @@ def extract_text_from_docx(file_path: str) -> Dict[str, Any]:
             'headers': [],
             'footers': [],
             'images': [],
-            'styles': set()
+            'styles': {}  # 以dict作有序集合，保证样式列表顺序稳定
         }
 
-        # 提取段落
-        for para in doc.paragraphs:
-            if para.text.strip():
-                para_data = {
-                    'text': para.text.strip(),
-                    'style': para.style.name,
-                    'alignment': str(para.alignment) if para.alignment else 'LEFT'
-                }
-                # 安全地获取段落格式属性
-                try:
-                    if hasattr(para.paragraph_format, 'first_line_indent'):
-                        para_data['first_line_indent'] = para.paragraph_format.first_line_indent
-                    if hasattr(para.paragraph_format, 'left_indent'):
-                        para_data['left_indent'] = para.paragraph_format.left_indent
-                    if hasattr(para.paragraph_format, 'right_indent'):
-                        para_data['right_indent'] = para.paragraph_format.right_indent
-                except:
-                    pass
-
-                document_data['paragraphs'].append(para_data)
-                document_data['styles'].add(para.style.name)
-
-        # 提取表格
-        for table in doc.tables:
+        body = doc.element.body
+        style_names = {style.style_id: style.name for style in doc.styles}
+        default_style = doc.styles.default(WD_STYLE_TYPE.PARAGRAPH)
+        default_style_name = default_style.name if default_style is not None else 'Normal'
+
+        # 提取段落（仅正文直接子段落，与 doc.paragraphs 一致）
+        for p_el in _DOCX_PARAGRAPHS(body):
+            text = _docx_paragraph_text(p_el).strip()
+            if not text:
+                continue
+
+            style_name = style_names.get(_DOCX_P_STYLE(p_el), default_style_name)
+            paragraph_data = {'text': text, 'style': style_name}
+
+            # 格式信息需要额外的XPath查询，仅在调用方需要时提取
+            if include_formatting:
+                alignment = _DOCX_P_ALIGN(p_el)
+                ind = _DOCX_P_IND(p_el)
+                ind_el = ind[0] if ind else None
+                hanging = _docx_indent(ind_el, 'hanging')
+                paragraph_data.update({
+                    'alignment': alignment.upper() if alignment else 'LEFT',
+                    'first_line_indent': -hanging if hanging is not None else _docx_indent(ind_el, 'firstLine'),
+                    'left_indent': _docx_indent(ind_el, 'left', 'start'),
+                    'right_indent': _docx_indent(ind_el, 'right', 'end')
+                })
+
+            document_data['paragraphs'].append(paragraph_data)
+            document_data['styles'][style_name] = None
+
+        # 提取表格（单元格文本与跨列数直接取自XML）
+        for tbl_el in _DOCX_TABLES(body):
             table_data = []
-            for row in table.rows:
+            for tr_el in _DOCX_ROWS(tbl_el):
                 row_data = []
-                for cell in row.cells:
-                    cell_data = {
-                        'text': cell.text.strip()
-                    }
-                    # 安全地获取单元格跨度
-                    try:
-                        if hasattr(cell._tc, 'tcPr') and cell._tc.tcPr:
-                            if hasattr(cell._tc.tcPr, 'gridSpan'):
-                                cell_data['spans'] = len(cell._tc.tcPr.gridSpan)
-                    except:
-                        cell_data['spans'] = 1
-                    row_data.append(cell_data)
+                for tc_el in _DOCX_CELLS(tr_el):
+                    grid_span = _DOCX_GRID_SPAN(tc_el)
+                    row_data.append({
+                        'text': '\n'.join(_docx_paragraph_text(p_el) for p_el in _DOCX_PARAGRAPHS(tc_el)).strip(),
+                        'spans': int(grid_span) if grid_span else 1
+                    })
                 table_data.append(row_data)
             document_data['tables'].append(table_data)
 
@@ -540,7 +1052,175 @@ def extract_text_from_docx(file_path: str) -> Dict[str, Any]:
         return None
 
 
-def extract_text_from_pdf(file_path: str) -> Dict[str, Any]:
+# 可选：pypdfium2（PDFium的C++实现），在PyPDF2无法提取某页文本时作为备用。
+# PDFium 的文本不含段落之间的空行，而文档结构分析按空行划分段落，因此不作为首选
+try:
+    import pypdfium2 as pdfium
+    HAS_PDFIUM = True
+except ImportError:
+    HAS_PDFIUM = False
+
+
+def _extract_page_text_pdfium(pdf, page_num: int) -> str:
+    """使用pypdfium2提取单页文本"""
+    page = pdf[page_num]
+    textpage = page.get_textpage()
+    try:
+        return textpage.get_text_range().replace('\r\n', '\n')
+    finally:
+        textpage.close()
+        page.close()
+
+
+# 可选：对无文本层的扫描页进行OCR
+try:
+    import pytesseract
+    from pdf2image import convert_from_path
+    HAS_TESSERACT = True
+except ImportError:
+    HAS_TESSERACT = False
+
+OCR_BATCH_PAGES = 8  # 每次渲染的最大连续页数，限制同时驻留内存的页面图像数量
+
+
+def _ocr_pdf_pages(file_path: str, page_numbers: List[int]) -> Dict[int, str]:
+    """
+    对指定页面（从0开始的页码）进行OCR：连续页一次渲染，
+    各页识别由线程池并行执行（tesseract 运行在独立子进程中，不受GIL限制）
+    """
+    batches = []
+    for num in sorted(page_numbers):
+        if batches and num == batches[-1][-1] + 1 and len(batches[-1]) < OCR_BATCH_PAGES:
+            batches[-1].append(num)
+        else:
+            batches.append([num])
+
+    def recognize(item):
+        num, image = item
+        try:
+            text = pytesseract.image_to_string(image, lang='chi_sim+eng')
+            if text:
+                logger.info(f"第 {num + 1} 页OCR成功提取文本，长度: {len(text)}")
+            else:
+                logger.warning(f"第 {num + 1} 页OCR未能提取到文本")
+            return num, text
+        except Exception as e:
+            logger.warning(f"第 {num + 1} 页OCR处理失败: {str(e)}")
+            return num, ''
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=min(OCR_BATCH_PAGES, os.cpu_count() or 1)) as executor:
+        for batch in batches:
+            first, last = batch[0] + 1, batch[-1] + 1
+            try:
+                logger.info(f"尝试对第 {first}-{last} 页进行OCR处理")
+                images = convert_from_path(file_path, first_page=first, last_page=last)
+            except Exception as e:
+                logger.warning(f"PDF页面渲染失败（第 {first}-{last} 页）: {str(e)}")
+                continue
+            results.update(executor.map(recognize, zip(batch, images)))
+    return results
+
+
+def _iter_reader_pages(reader, pdfium_doc=None) -> Generator[Dict[str, Any], None, None]:
+    """逐页产出页面数据（文本、尺寸、表单、链接），PyPDF2提取文本失败的页面改用pypdfium2；单页出错时跳过该页"""
+    for page_num in range(len(reader.pages)):
+        try:
+            page = reader.pages[page_num]
+            logger.info(f"处理第 {page_num + 1} 页")
+            
+            try:
+                try:
+                    text = page.extract_text()
+                except Exception as e:
+                    if pdfium_doc is None:
+                        raise
+                    logger.warning(f"PyPDF2 提取第 {page_num + 1} 页文本失败，改用pypdfium2: {str(e)}")
+                    text = _extract_page_text_pdfium(pdfium_doc, page_num)
+                if text:
+                    logger.info(f"第 {page_num + 1} 页成功提取文本，长度: {len(text)}")
+                else:
+                    logger.warning(f"第 {page_num + 1} 页文本为空")
+            except Exception as e:
+                logger.error(f"提取第 {page_num + 1} 页文本失败: {str(e)}")
+                text = ""
+            
+            page_data = {
+                'number': page_num + 1,
+                'text': text or "",
+                'size': {
+                    'width': float(page.mediabox.width),
+                    'height': float(page.mediabox.height)
+                },
+                'rotation': page.get('/Rotate', 0)
+            }
+
+            # 提取表单字段
+            if '/AcroForm' in page:
+                form_fields = []
+                try:
+                    for annot in page['/Annots']:
+                        if isinstance(annot, PyPDF2.generic.IndirectObject):
+                            annot = annot.get_object()
+                        if annot.get('/FT'):
+                            field_data = {
+                                'type': str(annot['/FT']),
+                                'name': str(annot.get('/T', '')),
+                                'value': str(annot.get('/V', ''))
+                            }
+                            form_fields.append(field_data)
+                    logger.info(f"成功提取 {len(form_fields)} 个表单字段")
+                except Exception as e:
+                    logger.warning(f"提取表单字段失败: {str(e)}")
+                page_data['forms'] = form_fields
+
+            # 提取链接
+            links = []
+            try:
+                if hasattr(page, 'annotations') and page.annotations:
+                    for annot in page.annotations:
+                        try:
+                            if isinstance(annot, PyPDF2.generic.IndirectObject):
+                                annot = annot.get_object()
+                            if annot and annot.get('/Subtype') == '/Link' and annot.get('/A'):
+                                link_data = {
+                                    'type': 'external',
+                                    'url': str(annot['/A'].get('/URI', ''))
+                                }
+                                if link_data['url']:  # 只添加有效的URL
+                                    links.append(link_data)
+                        except Exception as e:
+                            continue  # 跳过单个链接的错误
+                    logger.info(f"成功提取 {len(links)} 个链接")
+            except Exception as e:
+                logger.debug(f"页面 {page_num + 1} 没有链接或链接提取失败")
+            page_data['links'] = links
+
+            yield page_data
+        except Exception as e:
+            logger.error(f"处理第 {page_num + 1} 页时出错: {str(e)}")
+            continue
+
+
+def iter_pdf_pages(file_path: str) -> Generator[Dict[str, Any], None, None]:
+    """
+    流式逐页读取PDF，每次只持有一页的数据，适用于可以逐页消费的调用方。
+    不做OCR（扫描页的文本为空串），需要OCR和元数据时使用 extract_text_from_pdf
+    """
+    if not HAS_PYPDF2:
+        logger.error("PyPDF2 模块未安装")
+        return
+    with open(file_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        pdfium_doc = pdfium.PdfDocument(file_path) if HAS_PDFIUM else None
+        try:
+            yield from _iter_reader_pages(reader, pdfium_doc)
+        finally:
+            if pdfium_doc is not None:
+                pdfium_doc.close()
+
+
+def extract_text_from_pdf(file_path: str, file_size: Optional[int] = None) -> Dict[str, Any]:
     """增强的PDF文档文本提取"""
     if not HAS_PYPDF2:
         logger.error("PyPDF2 模块未安装")
@@ -557,11 +1237,13 @@ def extract_text_from_pdf(file_path: str) -> Dict[str, Any]:
 
         logger.info(f"开始处理PDF文件: {file_path}")
         
-        if not os.path.exists(file_path):
-            logger.error(f"PDF文件不存在: {file_path}")
-            return None
-            
-        file_size = os.path.getsize(file_path)
+        if file_size is None:
+            try:
+                file_size = os.stat(file_path).st_size
+            except FileNotFoundError:
+                logger.error(f"PDF文件不存在: {file_path}")
+                return None
+
         if file_size == 0:
             logger.error(f"PDF文件为空: {file_path}")
             return None
@@ -597,100 +1279,45 @@ def extract_text_from_pdf(file_path: str) -> Dict[str, Any]:
             except Exception as e:
                 logger.warning(f"提取元数据失败: {str(e)}")
 
-            # 提取页面内容
-            for page_num in range(len(reader.pages)):
+            # 页面文本、元数据、表单、链接由PyPDF2读取，pypdfium2 只用于PyPDF2提取失败的页面
+            pdfium_doc = None
+            if HAS_PDFIUM:
                 try:
-                    page = reader.pages[page_num]
-                    logger.info(f"处理第 {page_num + 1} 页")
-                    
-                    try:
-                        text = page.extract_text()
-                        if text:
-                            logger.info(f"第 {page_num + 1} 页成功提取文本，长度: {len(text)}")
-                        else:
-                            logger.warning(f"第 {page_num + 1} 页文本为空")
-                    except Exception as e:
-                        logger.error(f"提取第 {page_num + 1} 页文本失败: {str(e)}")
-                        text = ""
-                    
-                    # 如果页面文本为空，尝试OCR
-                    if not text and HAS_TESSERACT:
-                        try:
-                            logger.info(f"尝试对第 {page_num + 1} 页进行OCR处理")
-                            # 将PDF页面转换为图像
-                            images = convert_from_path(file_path, first_page=page_num+1, last_page=page_num+1)
-                            if images:
-                                text = pytesseract.image_to_string(images[0], lang='chi_sim+eng')
-                                if text:
-                                    logger.info(f"OCR成功提取文本，长度: {len(text)}")
-                                else:
-                                    logger.warning("OCR未能提取到文本")
-                        except Exception as e:
-                            logger.warning(f"OCR处理失败: {str(e)}")
-                    
-                    page_data = {
-                        'number': page_num + 1,
-                        'text': text or "",
-                        'size': {
-                            'width': float(page.mediabox.width),
-                            'height': float(page.mediabox.height)
-                        },
-                        'rotation': page.get('/Rotate', 0)
-                    }
-
-                    # 提取表单字段
-                    if '/AcroForm' in page:
-                        form_fields = []
-                        try:
-                            for annot in page['/Annots']:
-                                if isinstance(annot, PyPDF2.generic.IndirectObject):
-                                    annot = annot.get_object()
-                                if annot.get('/FT'):
-                                    field_data = {
-                                        'type': str(annot['/FT']),
-                                        'name': str(annot.get('/T', '')),
-                                        'value': str(annot.get('/V', ''))
-                                    }
-                                    form_fields.append(field_data)
-                            logger.info(f"成功提取 {len(form_fields)} 个表单字段")
-                        except Exception as e:
-                            logger.warning(f"提取表单字段失败: {str(e)}")
-                        page_data['forms'] = form_fields
-
-                    # 提取链接
-                    links = []
-                    try:
-                        if hasattr(page, 'annotations') and page.annotations:
-                            for annot in page.annotations:
-                                try:
-                                    if isinstance(annot, PyPDF2.generic.IndirectObject):
-                                        annot = annot.get_object()
-                                    if annot and annot.get('/Subtype') == '/Link' and annot.get('/A'):
-                                        link_data = {
-                                            'type': 'external',
-                                            'url': str(annot['/A'].get('/URI', ''))
-                                        }
-                                        if link_data['url']:  # 只添加有效的URL
-                                            links.append(link_data)
-                                except Exception as e:
-                                    continue  # 跳过单个链接的错误
-                            logger.info(f"成功提取 {len(links)} 个链接")
-                    except Exception as e:
-                        logger.debug(f"页面 {page_num + 1} 没有链接或链接提取失败")
-                    page_data['links'] = links
-
-                    document_data['pages'].append(page_data)
+                    pdfium_doc = pdfium.PdfDocument(file_path)
                 except Exception as e:
-                    logger.error(f"处理第 {page_num + 1} 页时出错: {str(e)}")
-                    continue
+                    logger.warning(f"pypdfium2 打开PDF失败，不使用备用文本提取: {str(e)}")
+
+            # 提取页面内容，文本为空的页面记录下来在所有页面处理完后统一OCR
+            ocr_pages = []
+            for page_data in _iter_reader_pages(reader, pdfium_doc):
+                if not page_data['text'] and HAS_TESSERACT:
+                    ocr_pages.append(page_data['number'] - 1)
+                document_data['pages'].append(page_data)
+
+            if pdfium_doc is not None:
+                pdfium_doc.close()
+
+            # 批量OCR无文本页面
+            if ocr_pages:
+                ocr_texts = _ocr_pdf_pages(file_path, ocr_pages)
+                for page_data in document_data['pages']:
+                    ocr_text = ocr_texts.get(page_data['number'] - 1)
+                    if ocr_text:
+                        page_data['text'] = ocr_text
 
             # 检查是否成功提取了任何文本
-            total_text = ''.join(page.get('text', '') for page in document_data['pages'])
-            if not total_text.strip():
+            # 只统计长度和是否含非空白字符，不拼接整篇文本
+            total_len = 0
+            has_text = False
+            for page in document_data['pages']:
+                text = page.get('text', '')
+                total_len += len(text)
+                has_text = has_text or (bool(text) and not text.isspace())
+            if not has_text:
                 logger.warning(f"未能从PDF文件 {file_path} 提取到任何文本")
                 return None
                 
-            logger.info(f"成功提取文本，总长度: {len(total_text)}")
+            logger.info(f"成功提取文本，总长度: {total_len}")
 
         return document_data
 
@@ -699,7 +1326,7 @@ def extract_text_from_pdf(file_path: str) -> Dict[str, Any]:
         return None
 
 
-def process_docx_file(file_path: str) -> Dict[str, Any]:
+def process_docx_file(file_path: str, file_size: Optional[int] = None) -> Dict[str, Any]:
     """增强的Word文档处理"""
     try:
         logger.info(f"处理Word文档: {file_path}")
@@ -712,11 +1339,8 @@ def process_docx_file(file_path: str) -> Dict[str, Any]:
         # 构建完整文本
         full_text = "\n".join([p['text'] for p in doc_data['paragraphs']])
 
-        # 提取关键信息
-        keywords = extract_advanced_keywords(full_text)
-
-        # 分析文档结构
-        doc_structure = extract_document_structure(full_text)
+        # 提取关键信息并分析文档结构（相同文本复用缓存结果）
+        keywords, doc_structure = analyze_text(full_text)
 
         # 构建结构化数据
         structured_data = {
@@ -725,7 +1349,7 @@ def process_docx_file(file_path: str) -> Dict[str, Any]:
             'metadata': {
                 'file_path': file_path,
                 'file_type': '.docx',
-                'file_size': os.path.getsize(file_path),
+                'file_size': file_size if file_size is not None else os.path.getsize(file_path),
                 'processed_time': datetime.now().isoformat(),
                 'document_properties': {
                     'sections': len(doc_data['sections']),
@@ -754,27 +1378,36 @@ def process_docx_file(file_path: str) -> Dict[str, Any]:
         return None
 
 
-def process_pdf_file(file_path: str) -> Dict[str, Any]:
+def process_pdf_file(file_path: str, file_size: Optional[int] = None) -> Dict[str, Any]:
     """增强的PDF文档处理"""
     try:
         logger.info(f"处理PDF文档: {file_path}")
 
         # 提取PDF内容和结构
-        pdf_data = extract_text_from_pdf(file_path)
+        if file_size is None:
+            file_size = os.path.getsize(file_path)
+        pdf_data = extract_text_from_pdf(file_path, file_size)
         if not pdf_data:
             return None
 
         # 构建完整文本
-        full_text = "\n".join([page.get('text', '') for page in pdf_data['pages']])
-        if not full_text.strip():
+        # 边写入边判断是否含有效文本，避免中间列表和 strip() 产生的副本
+        buf = io.StringIO()
+        has_text = False
+        for i, page in enumerate(pdf_data['pages']):
+            if i:
+                buf.write('\n')
+            text = page.get('text', '')
+            if text:
+                buf.write(text)
+                has_text = has_text or not text.isspace()
+        if not has_text:
             logger.warning(f"PDF文件 {file_path} 提取的文本为空")
             return None
+        full_text = buf.getvalue()
 
-        # 提取关键信息
-        keywords = extract_advanced_keywords(full_text)
-
-        # 分析文档结构
-        doc_structure = extract_document_structure(full_text)
+        # 提取关键信息并分析文档结构（相同文本复用缓存结果）
+        keywords, doc_structure = analyze_text(full_text)
 
         # 构建结构化数据
         structured_data = {
@@ -783,7 +1416,7 @@ def process_pdf_file(file_path: str) -> Dict[str, Any]:
             'metadata': {
                 'file_path': file_path,
                 'file_type': '.pdf',
-                'file_size': os.path.getsize(file_path),
+                'file_size': file_size,
                 'processed_time': datetime.now().isoformat(),
                 'pdf_metadata': pdf_data['metadata'],
                 'document_properties': {
@@ -817,94 +1450,104 @@ def process_pdf_file(file_path: str) -> Dict[str, Any]:
         return None
 
 
+# CSV列名场景关键词（各组关键词合并为一个交替模式，列名只扫描一次）
+_FRAUD_COLUMN_RE = re.compile('transaction|account|amount|balance|fraud|risk')
+_COMPLIANCE_COLUMN_RE = re.compile('compliance|regulation|policy|rule')
+
+
+# 基于文件名和内容的场景关键词，按优先级排列：任一场景的关键词出现即不再考虑后面的场景
+_FILE_NAME_SCENARIO_KEYWORDS = (
+    ('customer_service', ('customer', 'service', 'support', 'chat', 'qa')),
+    ('fraud_detection', ('fraud', 'risk', 'transaction', 'alert')),
+    ('compliance', ('compliance', 'regulation', 'policy')),
+)
+_CONTENT_SCENARIO_KEYWORDS = (
+    ('customer_service', ('customer service', 'support', 'help', 'question', 'answer')),
+    ('fraud_detection', ('fraud', 'suspicious', 'risk', 'alert', 'transaction')),
+    ('compliance', ('compliance', 'regulation', 'policy', 'requirement')),
+)
+
+
+def _build_scenario_automaton(scenario_keywords):
+    """把各场景关键词构建为一个Aho-Corasick自动机（值为场景优先级），未安装pyahocorasick时返回None"""
+    if not HAS_AHOCORASICK:
+        return None
+    automaton = ahocorasick.Automaton()
+    for rank, (_, keywords) in enumerate(scenario_keywords):
+        for keyword in keywords:
+            # 同一关键词属于多个场景时保留优先级最高的
+            if keyword not in automaton:
+                automaton.add_word(keyword, rank)
+    automaton.make_automaton()
+    return automaton
+
+
+_FILE_NAME_SCENARIO_AUTOMATON = _build_scenario_automaton(_FILE_NAME_SCENARIO_KEYWORDS)
+_CONTENT_SCENARIO_AUTOMATON = _build_scenario_automaton(_CONTENT_SCENARIO_KEYWORDS)
+
+
+def _match_scenario(text: str, scenario_keywords, automaton) -> Optional[str]:
+    """按优先级返回文本命中的场景，没有命中返回None"""
+    if automaton is None:
+        for scenario, keywords in scenario_keywords:
+            if any(kw in text for kw in keywords):
+                return scenario
+        return None
+
+    # 一次扫描找出命中关键词中优先级最高的场景，命中最高优先级时提前结束
+    # （不能用交替正则代替：正则返回位置最靠前的匹配，而不是优先级最高的场景）
+    best = None
+    for _, rank in automaton.iter(text):
+        if best is None or rank < best:
+            best = rank
+            if rank == 0:
+                break
+    return scenario_keywords[best][0] if best is not None else None
+
+
 def detect_scenario(file_path: str, content: str = None) -> str:
     """
     自动检测文件场景
-    使用场景适配模块进行智能场景检测
+    按文件类型、文件名和内容关键词规则检测
     """
     try:
-        # 如果有场景适配模块，优先使用
-        if HAS_SCENARIO_ADAPTATION:
-            # 读取文件内容（如果未提供）
-            if content is None:
-                try:
-                    with open(file_path, 'r', encoding=detect_file_encoding(file_path)) as f:
-                        content = f.read()
-                except Exception as e:
-                    logger.warning(f"读取文件内容失败: {str(e)}")
-                    content = ""
-
-            # 使用各个场景检测器
-            scores = {
-                'customer_service': 0,
-                'fraud_detection': 0,
-                'compliance': 0
-            }
-
-            # 客服场景检测
-            try:
-                cs_generator = CustomerServiceGenerator()
-                cs_score = cs_generator.evaluate_content(content)
-                scores['customer_service'] = cs_score
-            except Exception as e:
-                logger.debug(f"客服场景评分失败: {str(e)}")
-
-            # 欺诈检测场景检测
-            try:
-                fraud_encoder = FraudEncoder()
-                fraud_score = fraud_encoder.analyze_risk(content)
-                scores['fraud_detection'] = fraud_score
-            except Exception as e:
-                logger.debug(f"欺诈检测场景评分失败: {str(e)}")
-
-            # 合规场景检测
+        # 场景适配模块可用时读取文件内容（如果未提供），用于下面基于内容的规则
+        # （CustomerServiceGenerator / FraudEncoder / ComplianceMapper 均未提供场景评分方法，场景只按规则检测）
+        if HAS_SCENARIO_ADAPTATION and content is None:
             try:
-                compliance_mapper = ComplianceMapper()
-                compliance_score = compliance_mapper.evaluate_compliance(content)
-                scores['compliance'] = compliance_score
+                with open(file_path, 'r', encoding=detect_file_encoding(file_path)) as f:
+                    content = f.read()
             except Exception as e:
-                logger.debug(f"合规场景评分失败: {str(e)}")
+                logger.warning(f"读取文件内容失败: {str(e)}")
+                content = ""
 
-            # 选择得分最高的场景
-            if any(scores.values()):
-                selected_scenario = max(scores.items(), key=lambda x: x[1])[0]
-                logger.info(f"场景检测结果: {scores}")
-                logger.info(f"选择场景: {selected_scenario}")
-                return selected_scenario
-
-        # 如果场景适配模块不可用或评分全为0，使用基础规则检测
+        # 基础规则检测
         _, ext = os.path.splitext(file_path)
         
         # 基于文件类型的基础规则
         if ext.lower() == '.csv':
             try:
-                df = pd.read_csv(file_path)
-                columns = [col.lower() for col in df.columns]
-                if any(keyword in ' '.join(columns) for keyword in ['transaction', 'account', 'amount', 'balance', 'fraud', 'risk']):
+                # 只读取表头行做子串匹配，无需经过pandas解析CSV
+                with open(file_path, 'r', encoding=detect_file_encoding(file_path), newline='') as f:
+                    columns_text = f.readline().lower()
+                if _FRAUD_COLUMN_RE.search(columns_text):
                     return "fraud_detection"
-                elif any(keyword in ' '.join(columns) for keyword in ['compliance', 'regulation', 'policy', 'rule']):
+                elif _COMPLIANCE_COLUMN_RE.search(columns_text):
                     return "compliance"
             except:
                 pass
         
         # 基于文件名的规则
         file_name = os.path.basename(file_path).lower()
-        if any(kw in file_name for kw in ['customer', 'service', 'support', 'chat', 'qa']):
-            return "customer_service"
-        elif any(kw in file_name for kw in ['fraud', 'risk', 'transaction', 'alert']):
-            return "fraud_detection"
-        elif any(kw in file_name for kw in ['compliance', 'regulation', 'policy']):
-            return "compliance"
+        scenario = _match_scenario(file_name, _FILE_NAME_SCENARIO_KEYWORDS, _FILE_NAME_SCENARIO_AUTOMATON)
+        if scenario:
+            return scenario
         
         # 如果有内容，基于内容的规则
         if content:
-            content_lower = content.lower()
-            if any(kw in content_lower for kw in ['customer service', 'support', 'help', 'question', 'answer']):
-                return "customer_service"
-            elif any(kw in content_lower for kw in ['fraud', 'suspicious', 'risk', 'alert', 'transaction']):
-                return "fraud_detection"
-            elif any(kw in content_lower for kw in ['compliance', 'regulation', 'policy', 'requirement']):
-                return "compliance"
+            scenario = _match_scenario(content.lower(), _CONTENT_SCENARIO_KEYWORDS, _CONTENT_SCENARIO_AUTOMATON)
+            if scenario:
+                return scenario
 
         # 默认返回客服场景
         return "customer_service"
@@ -914,199 +1557,534 @@ def detect_scenario(file_path: str, content: str = None) -> str:
         return "customer_service"
 
 
-def process_file(file_path: str, output_dir: str) -> Dict[str, Any]:
-    """处理单个文件"""
-    logger.info(f"\n{'='*50}\n处理文件: {file_path}\n{'='*50}")
+# 可选：orjson（Rust实现的JSON序列化库），直接输出UTF-8字节
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+# 输出的JSON供下游程序读取，默认紧凑格式；调试时设置环境变量 SMARTFIN_PRETTY 输出带缩进的格式
+PRETTY_JSON = bool(os.environ.get('SMARTFIN_PRETTY'))
+# 流式写出结果时的文件缓冲区大小：逐块写入的小片段先在缓冲区内合并，减少write系统调用
+JSON_WRITE_BUFFER_SIZE = 64 * 1024
+
+
+def _json_bytes(obj: Any, indent: bool = False) -> bytes:
+    """序列化为UTF-8编码的JSON字节串，优先使用orjson（原生支持numpy类型），否则回退到标准库json"""
+    if HAS_ORJSON:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, option=option)
+        except TypeError:
+            pass  # orjson不支持的类型交由标准库处理
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode('utf-8')
+
+
+def _dump_json(obj: Any, path: str) -> None:
+    """将对象序列化为JSON，直接通过文件描述符写入（绕过Python的缓冲IO层）"""
+    data = memoryview(_json_bytes(obj, indent=PRETTY_JSON))
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        # os.write 可能只写入部分数据，需循环直至写完
+        while data:
+            data = data[os.write(fd, data):]
+    finally:
+        os.close(fd)
+
+
+def _dump_json_streaming(obj: Dict[str, Any], f, stream_key: str) -> None:
+    """
+    流式写出JSON（f 需以二进制模式打开）：外层字段整体序列化，stream_key 对应的大列表逐项序列化后直接写入文件，
+    避免为整个结果一次性构建完整的JSON字符串
+    """
+    if not PRETTY_JSON:
+        f.write(b'{')
+        for i, (key, value) in enumerate(obj.items()):
+            if i:
+                f.write(b',')
+            f.write(_json_bytes(key) + b':')
+            if key == stream_key and isinstance(value, list):
+                f.write(b'[')
+                for j, item in enumerate(value):
+                    if j:
+                        f.write(b',')
+                    f.write(_json_bytes(item))
+                f.write(b']')
+            else:
+                f.write(_json_bytes(value))
+        f.write(b'}')
+        return
+
+    f.write(b'{')
+    for i, (key, value) in enumerate(obj.items()):
+        f.write(b',\n  ' if i else b'\n  ')
+        f.write(_json_bytes(key) + b': ')
+        if key == stream_key and isinstance(value, list):
+            f.write(b'[')
+            for j, item in enumerate(value):
+                f.write(b',\n    ' if j else b'\n    ')
+                f.write(_json_bytes(item))
+            f.write(b'\n  ]' if value else b']')
+        else:
+            # JSON字符串内不含裸换行，可安全地整体缩进一层
+            f.write(_json_bytes(value, indent=True).replace(b'\n', b'\n  '))
+    f.write(b'\n}\n')
+
+
+# 可选：xxhash（比加密哈希快得多的非加密哈希），用于计算文件内容指纹
+try:
+    import xxhash
+    HAS_XXHASH = True
+except ImportError:
+    HAS_XXHASH = False
+
+def _file_content_hash(file_path: str) -> str:
+    """计算文件内容指纹"""
+    hasher = xxhash.xxh3_128() if HAS_XXHASH else hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def _find_duplicate_files(file_paths: List[str], file_sizes: List[Optional[int]]) -> Dict[int, List[int]]:
+    """
+    找出批次中内容完全相同的文件：先按目录扫描缓存的 (大小, 扩展名) 分组，
+    只对大小相同的候选文件计算内容指纹。返回 {首个文件的下标: [其余相同文件的下标]}
+    """
+    candidates: Dict[Tuple[int, str], List[int]] = {}
+    for i, (path, size) in enumerate(zip(file_paths, file_sizes)):
+        if size is not None:
+            candidates.setdefault((size, os.path.splitext(path)[1]), []).append(i)
+
+    duplicates: Dict[int, List[int]] = {}
+    for indices in candidates.values():
+        if len(indices) < 2:
+            continue
+        first_by_hash: Dict[str, int] = {}
+        for i in indices:
+            try:
+                digest = _file_content_hash(file_paths[i])
+            except OSError as e:
+                logger.warning("计算文件指纹失败，单独处理: %s (%s)", file_paths[i], e)
+                continue
+            first = first_by_hash.setdefault(digest, i)
+            if first != i:
+                duplicates.setdefault(first, []).append(i)
+    return duplicates
+
+
+# 设置环境变量 SMARTFIN_CACHE_DIR 后，文档读取结果按 (路径, 修改时间, 大小) 缓存在该目录中，
+# 重复运行时跳过PDF/DOCX解析；文档处理器的实现变化后需手动清空该目录
+DOCUMENT_CACHE_DIR = os.environ.get('SMARTFIN_CACHE_DIR')
+
+
+def _read_document(doc_processor: DocumentProcessor, file_path: str) -> Union[str, Dict[str, Any]]:
+    """读取文档内容，配置了 DOCUMENT_CACHE_DIR 时优先使用磁盘缓存（缓存读写失败不影响处理）"""
+    if not DOCUMENT_CACHE_DIR:
+        return doc_processor.process_document(file_path)
+
+    stat = os.stat(file_path)
+    key = f'{os.path.abspath(file_path)}\0{stat.st_mtime_ns}\0{stat.st_size}'.encode('utf-8')
+    cache_file = os.path.join(DOCUMENT_CACHE_DIR, hashlib.blake2b(key, digest_size=16).hexdigest() + '.pkl')
+    try:
+        with open(cache_file, 'rb') as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning("读取文档缓存失败，重新解析: %s", e)
+
+    doc_content = doc_processor.process_document(file_path)
+    try:
+        os.makedirs(DOCUMENT_CACHE_DIR, exist_ok=True)
+        # 先写临时文件再原子替换，并行的工作进程不会读到写了一半的缓存
+        tmp_file = f'{cache_file}.{os.getpid()}.tmp'
+        with open(tmp_file, 'wb') as f:
+            pickle.dump(doc_content, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except Exception as e:
+        logger.warning("写入文档缓存失败: %s", e)
+    return doc_content
+
+
+# 设置环境变量 SMARTFIN_COLUMNAR 后，每个文本块的实体和关系按字段列式输出（{字段: [值...]}），
+# 并在结果中写入 format_version；默认输出记录列表，与已有的下游程序兼容
+COLUMNAR_OUTPUT = bool(os.environ.get('SMARTFIN_COLUMNAR'))
+COLUMNAR_FORMAT_VERSION = 2  # 列式输出的格式版本（记录列表格式为版本1，不写版本字段）
+
+
+def _records_to_columns(records: List[Dict[str, Any]]) -> Union[Dict[str, List[Any]], List[Dict[str, Any]]]:
+    """
+    将记录列表转换为按字段存储的列式结构，每个字段名在输出中只出现一次。
+    只有全部记录字段相同时才转换（可用 _columns_to_records 无损还原），否则原样返回记录列表
+    """
+    if not records:
+        return {}
+    keys = list(records[0])
+    key_set = set(keys)
+    if any(len(record) != len(keys) or record.keys() != key_set for record in records):
+        return records
+    return {key: [record[key] for record in records] for key in keys}
+
+
+def _columns_to_records(columns: Union[Dict[str, List[Any]], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """_records_to_columns 的逆转换"""
+    if isinstance(columns, list):
+        return columns
+    keys = list(columns)
+    return [dict(zip(keys, values)) for values in zip(*columns.values())]
+
+
+# 无状态的文档读取/分块处理器，每个进程只构建一次（进程池中由 initializer 构建）
+_WORKER_PROCESSORS: Optional[Tuple[DocumentProcessor, ChunkManager]] = None
+
+
+def _init_worker(log_files: Tuple[str, ...] = ()) -> None:
+    """
+    进程池 initializer：为当前进程构建可复用的无状态处理器
+
+    Args:
+        log_files: 父进程写入的日志文件。spawn/forkserver 启动的子进程不继承父进程的日志配置，
+                   此时以追加模式写入同一文件（fork 启动的子进程已继承处理器，不再重复配置）
+    """
+    global _WORKER_PROCESSORS
+    root = logging.getLogger()
+    attached = {handler.baseFilename for handler in root.handlers
+                if isinstance(handler, logging.FileHandler)}
+    missing = [path for path in log_files if path not in attached]
+    if missing:
+        formatter = logging.Formatter(LOG_FORMAT)
+        for path in missing:
+            handler = logging.FileHandler(path, mode='a')
+            handler.setFormatter(formatter)
+            root.addHandler(handler)
+        root.setLevel(min(root.level, logging.INFO))
+    _WORKER_PROCESSORS = (DocumentProcessor(), ChunkManager())
+
+
+def _get_worker_processors() -> Tuple[DocumentProcessor, ChunkManager]:
+    """获取当前进程的无状态处理器，未经 initializer 初始化时（如顺序处理）按需构建"""
+    if _WORKER_PROCESSORS is None:
+        _init_worker()
+    return _WORKER_PROCESSORS
+
+
+# 每个文本块处理后反馈给自适应系统的固定模式和关键词，模式只编译一次；
+# learn_from_feedback 会复制其中的内容，共享同一个字典是安全的
+_COMPANY_RE = re.compile(r'(?:[\u4e00-\u9fa5]+(?:股份|科技|信息|集团|控股))')
+_MONEY_RE = re.compile(r'(?:\d+(?:\.\d+)?(?:亿|万)?美金)')
+_CHUNK_FEEDBACK = {
+    'patterns': {
+        'company': [_COMPANY_RE],
+        'money': [_MONEY_RE]
+    },
+    'keywords': {
+        'financial': ['营收', '利润', '增长', '下滑'],
+        'tech': ['人工智能', '区块链', '云计算', '大数据']
+    }
+}
+
+
+def _analyze_document(file_path: str, file_info: Dict[str, Any]) -> Dict[str, Any]:
+    """读取文档并逐块进行自适应处理和信息抽取（会补充 file_info['total_pages']）"""
+    # 初始化处理器：信息处理器和自适应系统带有按文件统计/学习的状态，每个文件单独构建
+    doc_processor, chunk_manager = _get_worker_processors()
+    info_processor = InformationProcessor()
+    adaptive_system = EnhancedAdaptiveSystem()
+
+    # 读取文档
+    doc_content = _read_document(doc_processor, file_path)
+    if isinstance(doc_content, dict) and doc_content.get('total_pages'):
+        file_info['total_pages'] = doc_content['total_pages']
+        text_chunks = doc_content['text_chunks']
+    else:
+        text_chunks = chunk_manager.split_text(doc_content)
+        file_info['total_pages'] = len(text_chunks)
+
+    # 处理结果
+    processed_chunks = []
+    # 汇总只需要数量，逐块累加计数，不再把全部实体/关系/异常另外收集一份
+    total_entities = total_relations = total_anomalies = 0
+
+    # 记录开始时间（耗时统计使用单调时钟）
+    start_time = time.perf_counter()
+
+    # 文本块信息只在循环外复制一次，每块只更新变化的两个字段；
+    # 两个处理器只读取这些信息，不会在结果之外保留引用
+    chunk_info = dict(file_info)
+
+    # 处理每个文本块
+    for i, chunk in enumerate(text_chunks, 1):
+        chunk_info['current_page'] = i
+        chunk_info['chunk_size'] = len(chunk)
+
+        # 使用自适应系统处理
+        adaptive_result = adaptive_system.process(chunk, {'file_info': chunk_info})
+
+        # 使用信息处理器处理
+        info_result = info_processor.process(adaptive_result['text'], chunk_info)
+
+        # 合并结果（开启 COLUMNAR_OUTPUT 时实体和关系按字段列式输出）
+        entities = info_result.get('entities', [])
+        relations = info_result.get('relations', [])
+        processed_chunk = {
+            'text': chunk,
+            'enhanced_text': adaptive_result['text'],
+            'entities': _records_to_columns(entities) if COLUMNAR_OUTPUT else entities,
+            'relations': _records_to_columns(relations) if COLUMNAR_OUTPUT else relations,
+            'anomalies': info_result.get('anomalies', []),
+            'scene': adaptive_result.get('scene'),
+            'context_enhancements': adaptive_result.get('context_enhancements', []),
+            'metadata': {
+                'chunk_number': i,
+                'chunk_size': len(chunk),
+                'processing_time': info_result.get('metadata', {}).get('processing_time', 0)
+            }
+        }
+
+        processed_chunks.append(processed_chunk)
+        total_entities += len(entities)
+        total_relations += len(relations)
+        total_anomalies += len(processed_chunk['anomalies'])
+
+        # 从处理结果中学习
+        adaptive_system.learn_from_feedback(chunk, _CHUNK_FEEDBACK)
+
+    # 生成处理报告
+    processing_time = time.perf_counter() - start_time
+
+    # 获取统计信息
+    adaptive_stats = adaptive_system.get_statistics()
+    info_stats = info_processor.get_statistics()
+
+    result = {
+        'file_info': file_info,
+        'processing_summary': {
+            'total_chunks': len(processed_chunks),
+            'total_entities': total_entities,
+            'total_relations': total_relations,
+            'total_anomalies': total_anomalies,
+            'processing_time': processing_time,
+            'adaptive_system_stats': adaptive_stats,
+            'information_processor_stats': info_stats
+        },
+        'processed_chunks': processed_chunks
+    }
+    if COLUMNAR_OUTPUT:
+        result['format_version'] = COLUMNAR_FORMAT_VERSION
+    return result
+
+
+def process_file(file_path: str, output_dir: str, file_size: Optional[int] = None) -> Dict[str, Any]:
+    """处理单个文件（file_size 可由调用方传入目录扫描时缓存的文件大小）"""
+    logger.info("\n%s\n处理文件: %s\n%s", '=' * 50, file_path, '=' * 50)
     
     try:
-        # 初始化处理器
-        doc_processor = DocumentProcessor()
-        chunk_manager = ChunkManager()
-        info_processor = InformationProcessor()
-        adaptive_system = EnhancedAdaptiveSystem()
-        
-        # 获取文件信息
+        # 获取文件信息（文件名只拆分一次，扩展名和输出文件名共用）
+        name = os.path.basename(file_path)
+        stem, ext = os.path.splitext(name)
         file_info = {
-            'name': os.path.basename(file_path),
+            'name': name,
             'path': file_path,
-            'size': os.path.getsize(file_path),
-            'type': os.path.splitext(file_path)[1]
+            'size': file_size if file_size is not None else os.path.getsize(file_path),
+            'type': ext
         }
         
-        # 读取文档
-        doc_content = doc_processor.process_document(file_path)
-        if isinstance(doc_content, dict) and doc_content.get('total_pages'):
-            file_info['total_pages'] = doc_content['total_pages']
-            text_chunks = doc_content['text_chunks']
-        else:
-            text_chunks = chunk_manager.split_text(doc_content)
-            file_info['total_pages'] = len(text_chunks)
-        
-        # 处理结果
-        processed_chunks = []
-        all_entities = []
-        all_relations = []
-        all_anomalies = []
-        
-        # 记录开始时间
-        start_time = datetime.now()
-        
-        # 处理每个文本块
-        for i, chunk in enumerate(text_chunks, 1):
-            chunk_info = {
-                **file_info,
-                'current_page': i,
-                'chunk_size': len(chunk)
-            }
-            
-            # 使用自适应系统处理
-            adaptive_result = adaptive_system.process(chunk, {'file_info': chunk_info})
-            
-            # 使用信息处理器处理
-            info_result = info_processor.process(adaptive_result['text'], chunk_info)
-            
-            # 合并结果
-            processed_chunk = {
-                'text': chunk,
-                'enhanced_text': adaptive_result['text'],
-                'entities': info_result.get('entities', []),
-                'relations': info_result.get('relations', []),
-                'anomalies': info_result.get('anomalies', []),
-                'scene': adaptive_result.get('scene'),
-                'context_enhancements': adaptive_result.get('context_enhancements', []),
-                'metadata': {
-                    'chunk_number': i,
-                    'chunk_size': len(chunk),
-                    'processing_time': info_result.get('metadata', {}).get('processing_time', 0)
-                }
-            }
-            
-            processed_chunks.append(processed_chunk)
-            all_entities.extend(processed_chunk['entities'])
-            all_relations.extend(processed_chunk['relations'])
-            all_anomalies.extend(processed_chunk['anomalies'])
-            
-            # 从处理结果中学习
-            feedback = {
-                'patterns': {
-                    'company': [r'(?:[\u4e00-\u9fa5]+(?:股份|科技|信息|集团|控股))'],
-                    'money': [r'(?:\d+(?:\.\d+)?(?:亿|万)?美金)']
-                },
-                'keywords': {
-                    'financial': ['营收', '利润', '增长', '下滑'],
-                    'tech': ['人工智能', '区块链', '云计算', '大数据']
-                }
-            }
-            adaptive_system.learn_from_feedback(chunk, feedback)
-        
-        # 生成处理报告
-        processing_time = (datetime.now() - start_time).total_seconds()
-        
-        # 获取统计信息
-        adaptive_stats = adaptive_system.get_statistics()
-        info_stats = info_processor.get_statistics()
-        
-        # 保存结果
-        result = {
-            'file_info': file_info,
-            'processing_summary': {
-                'total_chunks': len(processed_chunks),
-                'total_entities': len(all_entities),
-                'total_relations': len(all_relations),
-                'total_anomalies': len(all_anomalies),
-                'processing_time': processing_time,
-                'adaptive_system_stats': adaptive_stats,
-                'information_processor_stats': info_stats
-            },
-            'processed_chunks': processed_chunks
-        }
+        result = _analyze_document(file_path, file_info)
+        summary = result['processing_summary']
         
         # 保存到文件
-        output_file = os.path.join(
-            output_dir,
-            f"{os.path.splitext(file_info['name'])[0]}_processed.json"
-        )
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
+        output_file = _save_result(result, output_dir, stem)
         
-        logger.info(f"文件处理完成: {file_info['name']}")
-        logger.info(f"处理时间: {processing_time:.2f} 秒")
-        logger.info(f"发现实体: {len(all_entities)} 个")
-        logger.info(f"发现关系: {len(all_relations)} 个")
-        logger.info(f"发现异常: {len(all_anomalies)} 个")
-        logger.info(f"结果已保存到: {output_file}")
+        logger.info("文件处理完成: %s", file_info['name'])
+        logger.info("处理时间: %.2f 秒", summary['processing_time'])
+        logger.info("发现实体: %s 个", summary['total_entities'])
+        logger.info("发现关系: %s 个", summary['total_relations'])
+        logger.info("发现异常: %s 个", summary['total_anomalies'])
+        logger.info("结果已保存到: %s", output_file)
         
         return result
         
     except Exception as e:
-        logger.error(f"处理文件时出错: {str(e)}")
-        logger.error(traceback.format_exc())
+        # 堆栈只格式化一次，日志和返回结果共用
+        tb = traceback.format_exc()
+        logger.error("处理文件时出错: %s\n%s", e, tb.rstrip())
         return {
             'error': str(e),
             'file': file_path,
-            'traceback': traceback.format_exc()
+            'traceback': tb
         }
 
-def main(input_dir: str, output_dir: str):
-    """主处理函数"""
+def _save_result(result: Dict[str, Any], output_dir: str, stem: str) -> str:
+    """把单个文件的处理结果写入 <stem>_processed.json，返回输出文件路径"""
+    output_file = os.path.join(output_dir, f"{stem}_processed.json")
+    with open(output_file, 'wb', buffering=JSON_WRITE_BUFFER_SIZE) as f:
+        _dump_json_streaming(result, f, 'processed_chunks')
+    return output_file
+
+
+def _reuse_result(result: Dict[str, Any], file_path: str, output_dir: str,
+                  file_size: Optional[int] = None) -> Dict[str, Any]:
+    """内容与已处理文件相同的文件复用其处理结果：替换文件信息后写出该文件自己的输出"""
+    if 'error' in result:
+        return {**result, 'file': file_path}
+    try:
+        name = os.path.basename(file_path)
+        stem, ext = os.path.splitext(name)
+        file_info = {
+            'name': name,
+            'path': file_path,
+            'size': file_size if file_size is not None else os.path.getsize(file_path),
+            'type': ext,
+            'total_pages': result['file_info'].get('total_pages')
+        }
+        reused = {**result, 'file_info': file_info}
+        output_file = _save_result(reused, output_dir, stem)
+        logger.info("文件 %s 的内容与 %s 相同，复用处理结果，已保存到: %s",
+                    name, result['file_info']['name'], output_file)
+        return reused
+    except Exception as e:
+        tb = traceback.format_exc()
+        logger.error("处理文件时出错: %s\n%s", e, tb.rstrip())
+        return {
+            'error': str(e),
+            'file': file_path,
+            'traceback': tb
+        }
+
+
+def _process_file_worker(task: Tuple[str, str, Optional[int]]) -> Dict[str, Any]:
+    """进程池任务入口：处理器对象无法序列化，由各子进程在 process_file 内自行构建"""
+    file_path, output_dir, file_size = task
+    return process_file(file_path, output_dir, file_size)
+
+
+def process_files(file_paths: List[str], output_dir: str,
+                  file_sizes: Optional[List[Optional[int]]] = None,
+                  max_workers: Optional[int] = None,
+                  mp_context=None) -> Generator[Dict[str, Any], None, None]:
+    """
+    使用进程池并行处理多个文件，按完成顺序逐个产出 process_file 的结果（较慢的文件不会阻塞已完成文件的汇总）。
+    提交任务前在当前进程中找出内容相同的文件，每组只处理一次，其余文件复用结果
+
+    Args:
+        file_paths: 待处理文件路径列表
+        output_dir: 输出目录
+        file_sizes: 与 file_paths 对应的文件大小（可选）
+        max_workers: 最大进程数，默认为CPU核数；为1时在当前进程中顺序处理
+        mp_context: 进程池使用的 multiprocessing 上下文（如 spawn），默认为平台默认方式
+    """
+    if file_sizes is None:
+        file_sizes = [None] * len(file_paths)
+    duplicates = _find_duplicate_files(file_paths, file_sizes)
+    skipped = {i for indices in duplicates.values() for i in indices}
+    tasks = [(i, (path, output_dir, size))
+             for i, (path, size) in enumerate(zip(file_paths, file_sizes)) if i not in skipped]
+
+    def with_duplicates(index: int, result: Dict[str, Any]) -> Generator[Dict[str, Any], None, None]:
+        yield result
+        for dup in duplicates.get(index, ()):
+            yield _reuse_result(result, file_paths[dup], output_dir, file_sizes[dup])
+
+    if max_workers == 1 or len(tasks) <= 1:
+        for index, task in tasks:
+            yield from with_duplicates(index, _process_file_worker(task))
+        return
+
+    log_files = tuple(handler.baseFilename for handler in logging.getLogger().handlers
+                      if isinstance(handler, logging.FileHandler))
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context,
+                             initializer=_init_worker, initargs=(log_files,)) as executor:
+        futures = {executor.submit(_process_file_worker, task): index for index, task in tasks}
+        for future in as_completed(futures):
+            yield from with_duplicates(futures[future], future.result())
+
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.txt', '.csv')
+
+
+def scan_input_files(input_dir: str) -> List[os.DirEntry]:
+    """递归扫描输入目录，返回待处理文件的DirEntry（携带缓存的stat结果，扩展名不区分大小写）"""
+    entries = []
+    with os.scandir(input_dir) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                entries.extend(scan_input_files(entry.path))
+            elif entry.name.lower().endswith(SUPPORTED_EXTENSIONS) and entry.is_file():
+                entries.append(entry)
+    return entries
+
+
+def _entry_size(entry: os.DirEntry) -> Optional[int]:
+    """取DirEntry缓存的文件大小，stat失败时返回None，由处理阶段重新获取"""
+    try:
+        return entry.stat().st_size
+    except OSError:
+        return None
+
+
+def build_processing_report(files: List[os.DirEntry], results: List[Dict[str, Any]],
+                            processing_time: float) -> Dict[str, Any]:
+    """汇总各文件的处理结果，生成批次处理报告（由 main 统一写出一次）"""
+    # 单次遍历结果：划分成功/失败，同时累加各项统计
+    summary_keys = ('total_entities', 'total_relations', 'total_anomalies')
+    totals = dict.fromkeys(summary_keys, 0)
+    succeeded = []
+    failed = []
+    for r in results:
+        if 'error' in r:
+            failed.append(r)
+            continue
+        succeeded.append(r)
+        processing_summary = r.get('processing_summary', {})
+        for key in summary_keys:
+            totals[key] += processing_summary.get(key, 0)
+    # 结果按完成顺序到达，失败列表仍按输入顺序排列
+    input_order = {entry.path: i for i, entry in enumerate(files)}
+    failed.sort(key=lambda r: input_order.get(r['file'], 0))
+    return {
+        'total_files': len(files),
+        'processed_files': len(succeeded),
+        'failed_files': len(failed),
+        'processing_time': processing_time,
+        'processed_file_list': [entry.name for entry in files],
+        'failed_file_list': [os.path.basename(r['file']) for r in failed],
+        'summary': totals
+    }
+
+
+def main(input_dir: str, output_dir: str, max_workers: Optional[int] = None):
+    """主处理函数（max_workers 为并行处理的进程数，默认为CPU核数）"""
     try:
         # 创建输出目录
         os.makedirs(output_dir, exist_ok=True)
         
-        # 获取所有文件
-        files = []
-        for root, _, filenames in os.walk(input_dir):
-            for filename in filenames:
-                if filename.endswith(('.pdf', '.docx', '.txt', '.csv')):
-                    files.append(os.path.join(root, filename))
+        # 获取所有文件（单次scandir遍历，文件大小直接取自DirEntry的stat缓存）
+        files = scan_input_files(input_dir)
         
         logger.info(f"发现 {len(files)} 个文件待处理")
         
         # 处理所有文件
-        results = []
-        start_time = datetime.now()
-        
-        for file_path in files:
-            result = process_file(file_path, output_dir)
-            results.append(result)
+        start_time = time.perf_counter()
+        file_sizes = [_entry_size(entry) for entry in files]
+
+        # 各文件相互独立，交给进程池并行处理
+        results = list(process_files([entry.path for entry in files], output_dir, file_sizes,
+                                     max_workers=max_workers))
         
         # 生成总体报告
-        total_time = (datetime.now() - start_time).total_seconds()
+        total_time = time.perf_counter() - start_time
         
-        report = {
-            'total_files': len(files),
-            'processed_files': len([r for r in results if 'error' not in r]),
-            'failed_files': len([r for r in results if 'error' in r]),
-            'processing_time': total_time,
-            'processed_file_list': [os.path.basename(f) for f in files],
-            'failed_file_list': [
-                os.path.basename(r['file']) 
-                for r in results 
-                if 'error' in r
-            ],
-            'summary': {
-                'total_entities': sum(
-                    r.get('processing_summary', {}).get('total_entities', 0)
-                    for r in results
-                    if 'error' not in r
-                ),
-                'total_relations': sum(
-                    r.get('processing_summary', {}).get('total_relations', 0)
-                    for r in results
-                    if 'error' not in r
-                ),
-                'total_anomalies': sum(
-                    r.get('processing_summary', {}).get('total_anomalies', 0)
-                    for r in results
-                    if 'error' not in r
-                )
-            }
-        }
+        report = build_processing_report(files, results, total_time)
         
         # 保存报告
         report_file = os.path.join(output_dir, 'processing_report.json')
-        with open(report_file, 'w', encoding='utf-8') as f:
-            json.dump(report, f, ensure_ascii=False, indent=2)
+        _dump_json(report, report_file)
         
         logger.info(f"\n{'='*50}")
         logger.info(f"处理完成")
@@ -1117,25 +2095,40 @@ def main(input_dir: str, output_dir: str):
         logger.info(f"报告已保存到: {report_file}")
         
     except Exception as e:
-        logger.error(f"处理过程出错: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception("处理过程出错: %s", e)
         sys.exit(1)
 
 if __name__ == '__main__':
+    # 安装了新依赖时重新启动一次进程，使其在模块导入阶段生效
+    if not os.environ.get('SMARTFIN_DEPS_CHECKED') and ensure_deps():
+        logger.info("已安装新的依赖，重新启动处理程序")
+        os.environ['SMARTFIN_DEPS_CHECKED'] = '1'
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+
     # 设置默认目录
     default_input_dir = 'data'
     default_output_dir = 'output'
-    
-    if len(sys.argv) == 3:
-        input_dir = sys.argv[1]
-        output_dir = sys.argv[2]
+
+    parser = argparse.ArgumentParser(description='批量处理金融文档')
+    parser.add_argument('input_dir', nargs='?', help=f'输入目录（默认: {default_input_dir}）')
+    parser.add_argument('output_dir', nargs='?', help=f'输出目录（默认: {default_output_dir}）')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='并行处理的进程数，默认为CPU核数；为1时在当前进程中顺序处理')
+    args = parser.parse_args()
+
+    if args.input_dir and args.output_dir:
+        input_dir = args.input_dir
+        output_dir = args.output_dir
     else:
-        input_dir = default_input_dir
-        output_dir = default_output_dir
+        input_dir = args.input_dir or default_input_dir
+        output_dir = args.output_dir or default_output_dir
         logger.info(f"使用默认目录 - 输入: {input_dir}, 输出: {output_dir}")
+
+    if args.workers is not None and args.workers < 1:
+        parser.error('--workers 必须为正整数')
     
     if not os.path.exists(input_dir):
         logger.error(f"输入目录不存在: {input_dir}")
         sys.exit(1)
     
-    main(input_dir, output_dir)
\ No newline at end of file
+    main(input_dir, output_dir, max_workers=args.workers)
\ No newline at end of file
@@ -1,9 +1,34 @@
 # compliance_mapper.py
-from transformers import pipeline
 from typing import List, Dict, Optional
-import re
 import logging
 
+# 可选：google-re2（基于DFA的线性时间正则引擎，不会出现灾难性回溯），未安装时回退到标准库re
+try:
+    import re2 as re
+    HAS_RE2 = True
+except ImportError:
+    import re
+    HAS_RE2 = False
+
+# 可选：PyTorch，用于判断是否有GPU可以半精度运行摘要模型
+try:
+    import torch
+    HAS_TORCH = True
+except ImportError:
+    HAS_TORCH = False
+
+SUMMARY_BATCH_SIZE = 16  # map_clauses 每次送入摘要模型的文本数量
+SUMMARY_MIN_LENGTH = 50  # 短于该长度的文本不生成摘要
+HEADLINE_MAX_LENGTH = 200  # 短于该长度的单行且不含分句标点的文本视为标题，原样作为摘要
+
+# 法律条款引用模式：带条号的引用和"相关规定"式引用
+_LAW_REFERENCE_PATTERNS = (
+    re.compile(r"《([^》]+)》(第[零一二三四五六七八九十百]+条)"),
+    re.compile(r"《([^》]+)》(?:的)?相关规定"),
+)
+# 分句标点和换行：含有这些字符的文本是完整条款而不是标题
+_CLAUSE_BREAK_RE = re.compile(r"[。．.！!？?；;：:，,\r\n]")
+
 class ComplianceMapper:
     ENTITY_MAPPING = {
         "ORG": "responsible_party",
@@ -14,15 +39,28 @@ class ComplianceMapper:
     def __init__(self, model_path: str = None):
         self.summarizer = None
         try:
+            # transformers 导入耗时且占用大量内存，只在真正构建摘要模型时导入
+            from transformers import pipeline
             self.summarizer = pipeline(
                 "summarization",
                 model=model_path or "facebook/bart-large-cnn",
                 min_length=30,
-                max_length=150
+                max_length=150,
+                **self._device_options()
             )
         except Exception as e:
             logging.error(f"模型加载失败: {str(e)}")
 
+    @staticmethod
+    def _device_options() -> Dict:
+        """
+        摘要模型的设备和精度：有CUDA时放到GPU上以FP16运行（显存和带宽减半），
+        否则保持默认的CPU FP32（多数CPU没有原生BF16指令，转换反而更慢）
+        """
+        if HAS_TORCH and torch.cuda.is_available():
+            return {"device": 0, "torch_dtype": torch.float16}
+        return {}
+
     def map_clause(self, chunk) -> Dict:
         """保持原有接口，优化内部实现"""
         original_text = getattr(chunk, "original_text", "")
@@ -36,27 +74,79 @@ class ComplianceMapper:
             }
         }
 
+    def map_clauses(self, chunks: List, batch_size: int = SUMMARY_BATCH_SIZE) -> List[Dict]:
+        """批量映射条款，结果与逐个调用 map_clause 相同，摘要模型按批次一次前向计算多个文本"""
+        texts = [getattr(chunk, "original_text", "") for chunk in chunks]
+        summaries = self._generate_summaries(texts, batch_size)
+        return [
+            {
+                "original_text": text,
+                "clause": {
+                    "original_text": text,
+                    "summary": summary,
+                    "obligations": self._extract_obligations(chunk),
+                    "law_references": self._extract_law_references(text)
+                }
+            }
+            for chunk, text, summary in zip(chunks, texts, summaries)
+        ]
+
     def _extract_law_references(self, text: str) -> List[str]:
         """增强法律条款识别"""
-        patterns = [
-            r"《([^》]+)》(第[零一二三四五六七八九十百]+条)",
-            r"《([^》]+)》(?:的)?相关规定"
-        ]
         laws = []
-        for pattern in patterns:
+        for pattern in _LAW_REFERENCE_PATTERNS:
             laws += [f"《{match[0]}》{match[1]}" if len(match) > 1 else f"《{match[0]}》"
-                    for match in re.findall(pattern, text)]
+                    for match in pattern.findall(text)]
         return list(set(laws))
 
+    @staticmethod
+    def _is_headline(text: str) -> bool:
+        """不含分句标点的单行短文本（如条款标题）本身就是摘要，无需调用模型"""
+        text = text.strip()
+        return len(text) < HEADLINE_MAX_LENGTH and not _CLAUSE_BREAK_RE.search(text)
+
     def _generate_summary(self, text: str) -> Optional[str]:
-        if not self.summarizer or len(text) < 50:
+        if not self.summarizer or len(text) < SUMMARY_MIN_LENGTH:
             return None
+        if self._is_headline(text):
+            return text
         try:
             return self.summarizer(text, max_length=150)[0]['summary_text']
         except Exception as e:
             logging.error(f"摘要生成失败: {str(e)}")
             return None
 
+    def _generate_summaries(self, texts: List[str], batch_size: int) -> List[Optional[str]]:
+        """批量生成摘要，过短的文本不生成，标题式短文本原样作为摘要；批量调用失败时退回逐个生成"""
+        summaries: List[Optional[str]] = [None] * len(texts)
+        if not self.summarizer:
+            return summaries
+        # 只有需要真正生成摘要的文本送入模型
+        indices = []
+        for i, text in enumerate(texts):
+            if len(text) < SUMMARY_MIN_LENGTH:
+                continue
+            if self._is_headline(text):
+                summaries[i] = text
+            else:
+                indices.append(i)
+        if not indices:
+            return summaries
+        try:
+            results = self.summarizer(
+                [texts[i] for i in indices],
+                max_length=150,
+                batch_size=batch_size,
+                truncation=True
+            )
+            for i, result in zip(indices, results):
+                summaries[i] = result['summary_text']
+        except Exception as e:
+            logging.error(f"批量摘要生成失败，改为逐个生成: {str(e)}")
+            for i in indices:
+                summaries[i] = self._generate_summary(texts[i])
+        return summaries
+
     def _extract_obligations(self, chunk) -> List[Dict]:
         """兼容不同数据结构的实体输入"""
         entities = getattr(chunk, "entities", [])
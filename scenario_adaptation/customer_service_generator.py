@@ -1,8 +1,83 @@
 # -*- coding: utf-8 -*-
 # customer_service_generator.py
-from typing import Dict, List, Any, Union
+from typing import Dict, List, Any, Union, Optional
+import functools
 import logging
-import re
+import os
+import string
+from concurrent.futures import ProcessPoolExecutor
+
+# 可选：google-re2（基于DFA的线性时间正则引擎，不会出现灾难性回溯），未安装时回退到标准库re
+try:
+    import re2 as re
+    HAS_RE2 = True
+except ImportError:
+    import re
+    HAS_RE2 = False
+
+# 可选：pyahocorasick（Aho-Corasick自动机），一次扫描匹配全部意图关键词
+try:
+    import ahocorasick
+    HAS_AHOCORASICK = True
+except ImportError:
+    HAS_AHOCORASICK = False
+
+# 实体抽取模式：银行名称、金额、日期、信用卡号
+_BANK_RE = re.compile(r"(花旗银行|花旗|汇丰银行|工商银行|建设银行|农业银行)")
+# re2 的 \d、\s 只匹配ASCII字符，改用等价的Unicode字符类，保持与标准库re相同的匹配范围（如全角数字）
+if HAS_RE2:
+    _D = r"\p{Nd}"
+    _S = r"\t\n\v\f\r\x1c-\x1f\x85\p{Z}"
+else:
+    _D = r"\d"
+    _S = r"\s"
+_AMOUNT_RE = re.compile(rf"({_D}+(?:\.{_D}+)?)[{_S}]*(?:元|美元|USD|CNY|RMB)")
+_DATE_RE = re.compile(rf"({_D}{{4}}(?:/{_D}{{1,2}}){{2}}|{_D}{{4}}年{_D}{{1,2}}月{_D}{{1,2}}日)")
+_CARD_RE = re.compile(rf"({_D}{{4}}[{_S}-]?{_D}{{4}}[{_S}-]?{_D}{{4}}[{_S}-]?{_D}{{4}})")
+_ENTITY_PATTERNS = (
+    ("bank", _BANK_RE),
+    ("amount", _AMOUNT_RE),
+    ("date", _DATE_RE),
+    ("card", _CARD_RE),
+)
+_SENTENCE_SPLIT_RE = re.compile(r'[。！？.!?]')
+
+PARALLEL_MIN_CHUNKS = 2000  # 少于该数量的文本块直接顺序生成，进程间传输的开销超过并行收益
+INTENT_CACHE_SIZE = 128  # 按实体标签集合缓存的意图数量
+
+@functools.lru_cache(maxsize=None)
+def _template_fields(template: str) -> frozenset:
+    """回复模板引用的槽位名称（按模板字符串缓存）"""
+    return frozenset(
+        field.split(".", 1)[0].split("[", 1)[0]
+        for _, field, _, _ in string.Formatter().parse(template)
+        if field
+    )
+
+@functools.lru_cache(maxsize=None)
+def _compile_template(template: str) -> Optional[tuple]:
+    """
+    预解析回复模板为 (字面文本, 槽位名) 序列（按模板字符串缓存）
+    模板中含格式说明、转换符或属性/下标访问时返回None，由 format_map 渲染
+    """
+    parts = []
+    for literal, field, spec, conversion in string.Formatter().parse(template):
+        if field is not None and (spec or conversion or not field.isidentifier()):
+            return None
+        parts.append((literal, field))
+    return tuple(parts)
+
+def _render_template(template: str, slots: Dict[str, str]) -> str:
+    """按预解析的模板拼接槽位值，省去 format_map 每次重新解析模板的开销"""
+    parts = _compile_template(template)
+    if parts is None:
+        return template.format_map(slots)
+    out = []
+    for literal, field in parts:
+        out.append(literal)
+        if field is not None:
+            out.append(slots[field])
+    return "".join(out)
 
 class CustomerServiceGenerator:
     def __init__(self, config: Dict):
@@ -31,6 +106,20 @@ class CustomerServiceGenerator:
             "余额": "balance_query",
             "账户": "balance_query"
         }
+        self._intent_automaton = self._build_intent_automaton()
+        # 实体标签集合 -> 意图的缓存，基于构建时的 intent_mapping
+        self._mapping_items = tuple(self.intent_mapping.items())
+        self._intent_cache: Dict[frozenset, Union[str, None]] = {}
+
+    def _build_intent_automaton(self):
+        """把意图关键词构建为自动机（值为 (关键词在映射中的顺序, 意图)），未安装pyahocorasick时返回None"""
+        if not HAS_AHOCORASICK or not self.keyword_to_intent:
+            return None
+        automaton = ahocorasick.Automaton()
+        for rank, (keyword, intent) in enumerate(self.keyword_to_intent.items()):
+            automaton.add_word(keyword, (rank, intent))
+        automaton.make_automaton()
+        return automaton
 
     def generate_dialog(self, chunk) -> Dict:
         """生成客服对话"""
@@ -60,8 +149,9 @@ class CustomerServiceGenerator:
             }
         except Exception as e:
             logging.error(f"对话生成失败: {str(e)}", exc_info=True)
+            chunk_text = str(chunk)
             return {
-                "original_text": str(chunk)[:100] + "..." if len(str(chunk)) > 100 else str(chunk),
+                "original_text": chunk_text[:100] + "..." if len(chunk_text) > 100 else chunk_text,
                 "dialog": [
                     {"role": "user", "content": "我有一个问题需要咨询", "intent": "other"},
                     {"role": "assistant", "content": "感谢您的咨询，我们的客服人员会尽快回复您的问题。", "intent": "other"}
@@ -70,14 +160,40 @@ class CustomerServiceGenerator:
                 "error": str(e)
             }
 
+    def generate_dialogs(self, chunks: List) -> List[Dict]:
+        """批量生成客服对话，结果与逐个调用 generate_dialog 相同"""
+        generate = self.generate_dialog
+        return [generate(chunk) for chunk in chunks]
+
+    def generate_dialogs_parallel(self, chunks: List, workers: int = None) -> List[Dict]:
+        """
+        使用进程池并行生成客服对话（纯Python的CPU密集计算），结果顺序与 generate_dialogs 相同
+
+        Args:
+            chunks: 文本块列表（需可序列化）
+            workers: 最大进程数，默认为CPU核数；为1或文本块较少时在当前进程中顺序生成
+        """
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1 or len(chunks) < PARALLEL_MIN_CHUNKS:
+            return self.generate_dialogs(chunks)
+
+        # 每个进程分到约4个切片，兼顾负载均衡和序列化次数
+        step = -(-len(chunks) // (workers * 4))
+        slices = [chunks[i:i + step] for i in range(0, len(chunks), step)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return [dialog for part in executor.map(self.generate_dialogs, slices) for dialog in part]
+
     def _detect_intent(self, chunk) -> str:
         """检测意图"""
         # 从实体标签中检测意图
         if hasattr(chunk, "entities"):
-            entity_labels = {getattr(e, "label", "") for e in getattr(chunk, "entities", [])}
-            for label, intent in self.intent_mapping.items():
-                if label in entity_labels:
-                    return intent
+            # ProcessedChunk 直接提供标签集合，其他对象按需计算
+            labels = getattr(chunk, "label_set", None)
+            if labels is None:
+                labels = frozenset(getattr(e, "label", "") for e in chunk.entities)
+            intent = self._intent_from_labels(labels)
+            if intent is not None:
+                return intent
         
         # 从文本中检测关键词
         text = ""
@@ -88,40 +204,48 @@ class CustomerServiceGenerator:
         else:
             text = str(chunk)
             
-        # 检查关键词
+        # 检查关键词：按映射顺序取第一个出现在文本中的关键词
+        if self._intent_automaton is not None:
+            # 一次扫描找出命中关键词中顺序最靠前的一个，命中第一个关键词时提前结束
+            best = None
+            for _, hit in self._intent_automaton.iter(text):
+                if best is None or hit[0] < best[0]:
+                    best = hit
+                    if hit[0] == 0:
+                        break
+            return best[1] if best is not None else "other"
+
         for keyword, intent in self.keyword_to_intent.items():
             if keyword in text:
                 return intent
                 
         return "other"
 
+    def _intent_from_labels(self, entity_labels: frozenset) -> Union[str, None]:
+        """按实体标签集合查找意图（按 intent_mapping 顺序取第一个命中的标签），结果按标签集合缓存"""
+        try:
+            return self._intent_cache[entity_labels]
+        except KeyError:
+            pass
+        intent = next(
+            (intent for label, intent in self._mapping_items if label in entity_labels),
+            None
+        )
+        # 标签组合通常很少，超出上限时丢弃最早的缓存项
+        if len(self._intent_cache) >= INTENT_CACHE_SIZE:
+            del self._intent_cache[next(iter(self._intent_cache))]
+        self._intent_cache[entity_labels] = intent
+        return intent
+
     def _extract_entities(self, text: str) -> Dict[str, str]:
         """从文本中提取实体"""
         entities = {}
         
-        # 提取银行名称
-        bank_pattern = r"(花旗银行|花旗|汇丰银行|工商银行|建设银行|农业银行)"
-        bank_match = re.search(bank_pattern, text)
-        if bank_match:
-            entities["bank"] = bank_match.group(1)
-            
-        # 提取金额
-        amount_pattern = r"(\d+(?:\.\d+)?)\s*(?:元|美元|USD|CNY|RMB)"
-        amount_match = re.search(amount_pattern, text)
-        if amount_match:
-            entities["amount"] = amount_match.group(1)
-            
-        # 提取日期
-        date_pattern = r"(\d{4}(?:/\d{1,2}){2}|\d{4}年\d{1,2}月\d{1,2}日)"
-        date_match = re.search(date_pattern, text)
-        if date_match:
-            entities["date"] = date_match.group(1)
-            
-        # 提取信用卡号
-        card_pattern = r"(\d{4}[\s-]?\d{4}[\s-]?\d{4}[\s-]?\d{4})"
-        card_match = re.search(card_pattern, text)
-        if card_match:
-            entities["card"] = card_match.group(1)
+        # 各类实体独立取第一个匹配（同一段数字可能同时是卡号和金额），不能合并成一个交替模式
+        for name, pattern in _ENTITY_PATTERNS:
+            match = pattern.search(text)
+            if match:
+                entities[name] = match.group(1)
             
         return entities
 
@@ -138,7 +262,7 @@ class CustomerServiceGenerator:
             content = f"我想了解一下关于{entities['bank']}最近的收购新闻"
         else:
             # 从原文中提取第一句话作为用户问题
-            sentences = re.split(r'[。！？.!?]', text)
+            sentences = _SENTENCE_SPLIT_RE.split(text)
             content = next((s for s in sentences if len(s.strip()) > 5), text[:50])
             
         return {"role": "user", "content": content, "intent": intent}
@@ -147,12 +271,14 @@ class CustomerServiceGenerator:
         """构建助手对话轮次"""
         template = self.response_templates.get(intent, self.response_templates.get("other"))
         
-        # 填充模板中的槽位
-        try:
-            content = template.format(**entities)
-        except KeyError:
-            # 如果缺少必要的槽位，使用默认回复
+        # 填充模板中的槽位；缺少必要的槽位时使用默认回复（先检查槽位，避免常见情况下抛出KeyError）
+        if not _template_fields(template) <= entities.keys():
             content = self.response_templates.get("other")
+        else:
+            try:
+                content = _render_template(template, entities)
+            except KeyError:
+                content = self.response_templates.get("other")
             
         return {
             "role": "assistant",
@@ -1,17 +1,37 @@
 # fraud_encoder.py
 # -*- coding: utf-8 -*-
-import networkx as nx
+from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Union
+from typing import List, Dict, Any, Union, Iterable, Optional
 import logging
 import pandas as pd
 
 
+LARGE_AMOUNT_THRESHOLD = 1000  # 大额交易阈值
+# pandas 2.0 起 to_datetime 才支持 format='mixed'，更早的版本逐个解析
+PANDAS_MIXED_FORMAT = int(pd.__version__.split('.')[0]) >= 2
+
+
 class FraudEncoder:
-    def __init__(self, time_window_minutes: int = 15):
-        self.graph = nx.MultiDiGraph()
+    def __init__(self, time_window_minutes: int = 15,
+                 accepted_relation_types: Iterable[str] = ("TRANSFER_TO",)):
+        # 交易图：节点ID -> 属性，加上按节点索引的出边/入边记录（只追加，免去 networkx 多重图的封装开销）
+        self.nodes: Dict[Any, Dict[str, Any]] = {}
+        self.out_edges: Dict[Any, List[Dict[str, Any]]] = defaultdict(list)
+        self.in_edges: Dict[Any, List[Dict[str, Any]]] = defaultdict(list)
+        # 视为转账的关系类型
+        self._accepted_rel_types = frozenset(accepted_relation_types)
+        # 文本转账交易节点的ID：单调递增的整数，不与账户名称（字符串）冲突
+        self._next_tx_id = 0
+        # 边数单独计数，逐行输出统计时无需遍历全部边记录
+        self._edge_count = 0
         self.time_window = timedelta(minutes=time_window_minutes)
+        self._window_seconds = self.time_window.total_seconds()
         self.transactions = []
+        # 按账户增量维护的检测索引（交易数、最早/最晚交易时间、大额交易），检测时无需重新分组扫描全部交易
+        self._account_index: Dict[str, Dict[str, Any]] = {}
+        # 上次增量检测以来有新交易的账户（dict 保持账户首次加入的顺序）
+        self._dirty_accounts: Dict[str, None] = {}
 
     def add_transaction_chunk(self, chunk: Union[Dict[str, Any], pd.Series]) -> Dict:
         """处理交易数据块，构建交易关系图"""
@@ -19,27 +39,47 @@ class FraudEncoder:
             # 如果是pandas Series，转换为字典
             if isinstance(chunk, pd.Series):
                 return self._process_dataframe_row(chunk)
-                
-            # 如果是文本块，提取实体和关系
-            accounts = {e.text for e in getattr(chunk, "entities", [])
-                       if getattr(e, "label", "") == "ACCOUNT"}
-
-            # 添加账户节点（自动去重）
-            for acc in accounts:
-                if not self.graph.has_node(acc):
-                    self.graph.add_node(acc,
-                                      node_type="account",
-                                      last_activity=datetime.now().isoformat())
-
-            # 处理交易关系
-            for rel in getattr(chunk, "relations", []):
-                if getattr(rel, "relation_type", "") == "TRANSFER_TO":
+
+            nodes_before, edges_before = len(self.nodes), self._edge_count
+
+            # 如果是文本块，提取实体和关系（ProcessedChunk 提供按标签分组的实体）
+            by_label = getattr(chunk, "entities_by_label", None)
+            if by_label is not None:
+                accounts = {e.text for e in by_label.get("ACCOUNT", ())}
+            else:
+                accounts = {e.text for e in getattr(chunk, "entities", [])
+                            if getattr(e, "label", "") == "ACCOUNT"}
+            relations = getattr(chunk, "relations", [])
+
+            # 既没有账户实体也没有关系时图不变，直接返回统计信息
+            if not accounts and not relations:
+                return self._generate_output(chunk, nodes_before, edges_before)
+
+            # 同一数据块内的账户和交易共用一个时间戳
+            now_iso = datetime.now().isoformat()
+
+            # 添加账户节点（自动去重，只添加图中尚不存在的账户）
+            self._add_nodes(
+                (acc, {"node_type": "account", "last_activity": now_iso})
+                for acc in accounts - self.nodes.keys()
+            )
+
+            # 处理交易关系：先收集整个数据块的交易节点和边，再一次性加入图中
+            tx_nodes = []
+            edges = []
+            for rel in relations:
+                if getattr(rel, "relation_type", "") in self._accepted_rel_types:
                     self._process_transfer(
                         getattr(rel.source, "text", ""),
-                        getattr(rel.target, "text", "")
+                        getattr(rel.target, "text", ""),
+                        now_iso,
+                        tx_nodes,
+                        edges
                     )
+            self._add_nodes(tx_nodes)
+            self._add_edges(edges)
 
-            return self._generate_output(chunk)
+            return self._generate_output(chunk, nodes_before, edges_before)
 
         except Exception as e:
             logging.error(f"交易处理失败: {str(e)}", exc_info=True)
@@ -48,6 +88,8 @@ class FraudEncoder:
     def _process_dataframe_row(self, row: pd.Series) -> Dict:
         """处理DataFrame中的交易数据行"""
         try:
+            nodes_before, edges_before = len(self.nodes), self._edge_count
+
             # 获取必要的字段
             source_acc = str(row.get('AccountID', ''))
             if not source_acc:
@@ -66,16 +108,15 @@ class FraudEncoder:
                 if pd.isna(row.get('TransactionDate')):
                     timestamp = datetime.now()
                 else:
-                    timestamp = pd.to_datetime(row.get('TransactionDate'))
+                    timestamp = self._normalize_timestamp(pd.to_datetime(row.get('TransactionDate')))
             except Exception:
                 timestamp = datetime.now()
                 logging.warning(f"交易时间转换失败: {row.get('TransactionDate')}")
             
             # 添加账户节点
-            if not self.graph.has_node(source_acc):
-                self.graph.add_node(source_acc,
-                                  node_type="account",
-                                  last_activity=timestamp.isoformat())
+            if source_acc not in self.nodes:
+                self._add_nodes([(source_acc, {"node_type": "account",
+                                               "last_activity": timestamp.isoformat()})])
 
             # 添加交易节点
             tx_id = f"tx_{source_acc}_{timestamp.timestamp()}"
@@ -88,11 +129,11 @@ class FraudEncoder:
                 "device_id": row.get('DeviceID', '')
             }
             
-            self.graph.add_node(tx_id, **tx_data)
-            self.graph.add_edge(source_acc, tx_id, relation_type="initiated")
+            self._add_nodes([(tx_id, tx_data)])
+            self._add_edges([(source_acc, tx_id, {"relation_type": "initiated"})])
             
             # 存储交易记录
-            self.transactions.append({
+            self._record_transaction({
                 "transaction_id": tx_id,
                 "account_id": source_acc,
                 "amount": amount,
@@ -102,30 +143,202 @@ class FraudEncoder:
                 "device_id": row.get('DeviceID', '')
             })
             
-            return self._generate_output(row)
+            return self._generate_output(row, nodes_before, edges_before)
 
         except Exception as e:
             logging.error(f"DataFrame行处理失败: {str(e)}", exc_info=True)
             return {}
 
-    def _process_transfer(self, source: str, target: str):
-        """封装交易处理逻辑"""
+    def add_transactions_df(self, df: pd.DataFrame) -> Dict:
+        """
+        批量处理交易DataFrame，逐行结果与 add_transaction_chunk(row) 相同：
+        金额和时间按列整体转换，节点和边一次性批量加入交易图
+        """
+        try:
+            if 'AccountID' not in df.columns:
+                logging.warning("交易数据缺少AccountID字段")
+                return {}
+
+            n = len(df)
+            nodes_before, edges_before = len(self.nodes), self._edge_count
+            accounts = df['AccountID'].astype(str).tolist()
+            amounts = self._column_amounts(df['TransactionAmount']) if 'TransactionAmount' in df.columns else [0.0] * n
+            timestamps = self._column_timestamps(df['TransactionDate']) if 'TransactionDate' in df.columns else [None] * n
+            tx_types, locations, device_ids = (
+                df[col].tolist() if col in df.columns else [''] * n
+                for col in ('TransactionType', 'Location', 'DeviceID')
+            )
+
+            nodes = []
+            edges = []
+            records = []
+            seen_accounts = set()
+            processed = 0
+            for source_acc, amount, timestamp, tx_type, location, device_id in zip(
+                    accounts, amounts, timestamps, tx_types, locations, device_ids):
+                if not source_acc:
+                    logging.warning("交易数据缺少AccountID字段")
+                    continue
+                if timestamp is None:
+                    timestamp = datetime.now()
+
+                # 账户节点只在首次出现时添加，交易节点和边按行顺序加入
+                if source_acc not in seen_accounts:
+                    seen_accounts.add(source_acc)
+                    if source_acc not in self.nodes:
+                        nodes.append((source_acc, {"node_type": "account",
+                                                   "last_activity": timestamp.isoformat()}))
+
+                tx_id = f"tx_{source_acc}_{timestamp.timestamp()}"
+                nodes.append((tx_id, {
+                    "node_type": "transaction",
+                    "amount": amount,
+                    "timestamp": timestamp.isoformat(),
+                    "transaction_type": tx_type,
+                    "location": location,
+                    "device_id": device_id
+                }))
+                edges.append((source_acc, tx_id, {"relation_type": "initiated"}))
+
+                records.append({
+                    "transaction_id": tx_id,
+                    "account_id": source_acc,
+                    "amount": amount,
+                    "timestamp": timestamp,
+                    "type": tx_type,
+                    "location": location,
+                    "device_id": device_id
+                })
+                processed += 1
+
+            # 整批数据转换完成后才修改编码器状态，处理中途出错不会留下只更新了一部分的交易记录和交易图
+            self._add_nodes(nodes)
+            self._add_edges(edges)
+            for tx in records:
+                self._record_transaction(tx)
+
+            return {
+                "processed_rows": processed,
+                "nodes_count": len(self.nodes),
+                "edges_count": self._edge_count,
+                "nodes_added": len(self.nodes) - nodes_before,
+                "edges_added": self._edge_count - edges_before,
+                "transactions_count": len(self.transactions)
+            }
+
+        except Exception as e:
+            logging.error(f"DataFrame批量处理失败: {str(e)}", exc_info=True)
+            return {}
+
+    @staticmethod
+    def _column_amounts(values: pd.Series) -> List[float]:
+        """整列转换交易金额，转换失败的值记为0（与逐行处理一致）"""
+        if values.dtype.kind in 'biuf':
+            return values.astype(float).tolist()
+        amounts = []
+        for value in values.tolist():
+            try:
+                amounts.append(float(value))
+            except (ValueError, TypeError):
+                amounts.append(0)
+                logging.warning(f"交易金额转换失败: {value}")
+        return amounts
+
+    @staticmethod
+    def _column_timestamps(values: pd.Series) -> List[Any]:
+        """
+        整列解析交易时间，缺失或无法解析的值返回None（由调用方取当前时间）。
+        带时区的时间统一转换为不带时区的UTC时间，整批时间都可以相互比较
+        """
+        if PANDAS_MIXED_FORMAT:
+            try:
+                parsed = pd.to_datetime(values, errors='coerce', format='mixed')
+                return [None if pd.isna(ts) else FraudEncoder._normalize_timestamp(ts) for ts in parsed]
+            except Exception:
+                pass
+        # 整列解析失败（如时区混杂）或 pandas 不支持 format='mixed' 时逐个解析
+        timestamps = []
+        for value in values.tolist():
+            try:
+                timestamps.append(None if pd.isna(value)
+                                  else FraudEncoder._normalize_timestamp(pd.to_datetime(value)))
+            except Exception:
+                timestamps.append(None)
+                logging.warning(f"交易时间转换失败: {value}")
+        return timestamps
+
+    @staticmethod
+    def _normalize_timestamp(timestamp):
+        """带时区的交易时间转换为不带时区的UTC时间，避免与不带时区的时间比较时报错"""
+        if getattr(timestamp, 'tzinfo', None) is not None:
+            return pd.Timestamp(timestamp).tz_convert(None)
+        return timestamp
+
+    def _add_nodes(self, nodes: Iterable):
+        """加入 (节点ID, 属性) 节点；节点已存在时合并属性"""
+        for node_id, attrs in nodes:
+            data = self.nodes.get(node_id)
+            if data is None:
+                self.nodes[node_id] = attrs
+            else:
+                data.update(attrs)
+
+    def _add_edges(self, edges: List):
+        """加入 (来源, 目标, 属性) 边，同一对节点间允许多条边；端点不存在时以空属性创建"""
+        nodes = self.nodes
+        for source, target, attrs in edges:
+            if source not in nodes:
+                nodes[source] = {}
+            if target not in nodes:
+                nodes[target] = {}
+            edge = {"source": source, "target": target, **attrs}
+            self.out_edges[source].append(edge)
+            self.in_edges[target].append(edge)
+        self._edge_count += len(edges)
+
+    def _record_transaction(self, tx: Dict[str, Any]):
+        """保存交易记录并更新所属账户的检测索引"""
+        self.transactions.append(tx)
+        timestamp = tx["timestamp"]
+        entry = self._account_index.get(tx["account_id"])
+        if entry is None:
+            entry = self._account_index[tx["account_id"]] = {
+                "count": 0, "first": timestamp, "last": timestamp, "large": [], "large_sorted": True
+            }
+        entry["count"] += 1
+        self._dirty_accounts[tx["account_id"]] = None
+        # 与按时间稳定排序后取首尾一致：时间相同时最早取先加入的，最晚取后加入的
+        if timestamp < entry["first"]:
+            entry["first"] = timestamp
+        if timestamp >= entry["last"]:
+            entry["last"] = timestamp
+        if tx["amount"] > LARGE_AMOUNT_THRESHOLD:
+            # 交易通常按时间顺序到达，只有乱序加入时才需要在检测时重新排序
+            large = entry["large"]
+            if large and timestamp < large[-1]["timestamp"]:
+                entry["large_sorted"] = False
+            large.append(tx)
+
+    def _process_transfer(self, source: str, target: str, timestamp: str, tx_nodes: List, edges: List):
+        """封装交易处理逻辑：生成的交易节点和边追加到 tx_nodes/edges，由调用方批量加入交易图"""
         if not source or not target:
             return
 
-        tx_id = f"tx_{source}_{target}_{datetime.now().timestamp()}"
+        # 来源和目标账户由边记录，交易ID只需唯一
+        tx_id = self._next_tx_id
+        self._next_tx_id += 1
         tx_data = {
             "node_type": "transaction",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": timestamp
         }
 
-        # 添加交易节点和边
-        self.graph.add_node(tx_id, **tx_data)
-        self.graph.add_edge(source, tx_id, relation_type="initiated")
-        self.graph.add_edge(tx_id, target, relation_type="sent_to")
+        # 交易节点和边
+        tx_nodes.append((tx_id, tx_data))
+        edges.append((source, tx_id, {"relation_type": "initiated"}))
+        edges.append((tx_id, target, {"relation_type": "sent_to"}))
 
-    def _generate_output(self, chunk) -> Dict:
-        """生成输出结果"""
+    def _generate_output(self, chunk, nodes_before: int, edges_before: int) -> Dict:
+        """生成输出结果：只返回图的规模和本次新增的节点/边数，完整的图由 snapshot() 导出"""
         if isinstance(chunk, pd.Series):
             original_data = chunk.to_dict()
         else:
@@ -133,48 +346,64 @@ class FraudEncoder:
             
         return {
             "original_data": original_data,
-            "nodes_count": len(self.graph.nodes),
-            "edges_count": len(self.graph.edges),
+            "nodes_count": len(self.nodes),
+            "edges_count": self._edge_count,
+            "nodes_added": len(self.nodes) - nodes_before,
+            "edges_added": self._edge_count - edges_before,
             "transactions_count": len(self.transactions)
         }
 
-    def detect_suspicious_patterns(self) -> List[Dict]:
-        """检测可疑交易模式"""
+    def snapshot(self) -> Dict[str, List]:
+        """导出完整的交易图（节点及属性、全部边记录），开销与图的规模成正比"""
+        return {
+            "nodes": [(node_id, dict(attrs)) for node_id, attrs in self.nodes.items()],
+            "edges": [dict(edge) for out in self.out_edges.values() for edge in out]
+        }
+
+    def detect_suspicious_patterns(self, accounts: Optional[Iterable[str]] = None) -> List[Dict]:
+        """
+        检测可疑交易模式
+
+        Args:
+            accounts: 只检测这些账户（按给定顺序）；默认检测全部账户
+        """
         suspicious = []
-        
-        # 检查高频交易
-        account_transactions = {}
-        for tx in self.transactions:
-            acc_id = tx["account_id"]
-            if acc_id not in account_transactions:
-                account_transactions[acc_id] = []
-            account_transactions[acc_id].append(tx)
-        
-        # 检查每个账户的交易
-        for acc_id, txs in account_transactions.items():
-            # 按时间排序
-            txs.sort(key=lambda x: x["timestamp"])
-            
+
+        # 检查每个账户的交易（默认按账户首次出现的顺序）
+        index = self._account_index
+        if accounts is None:
+            items = index.items()
+        else:
+            items = ((acc_id, index[acc_id]) for acc_id in accounts if acc_id in index)
+        for acc_id, entry in items:
             # 检查高频交易
-            if len(txs) >= 3:
-                time_diff = (txs[-1]["timestamp"] - txs[0]["timestamp"]).total_seconds() / 60
-                if time_diff < self.time_window.total_seconds() / 60:
+            if entry["count"] >= 3:
+                time_diff = (entry["last"] - entry["first"]).total_seconds()
+                if time_diff < self._window_seconds:
                     suspicious.append({
                         "type": "high_frequency_transfer",
                         "account": acc_id,
-                        "transaction_count": len(txs),
-                        "time_range": f"{txs[0]['timestamp']} - {txs[-1]['timestamp']}"
-                    })
-            
-            # 检查大额交易
-            for tx in txs:
-                if tx["amount"] > 1000:  # 设置大额交易阈值
-                    suspicious.append({
-                        "type": "large_amount_transaction",
-                        "transaction_id": tx["transaction_id"],
-                        "account": acc_id,
-                        "amount": tx["amount"],
-                        "timestamp": tx["timestamp"].isoformat() if isinstance(tx["timestamp"], datetime) else tx["timestamp"]
+                        "transaction_count": entry["count"],
+                        "time_range": f"{entry['first']} - {entry['last']}"
                     })
 
-        return suspicious
\ No newline at end of file
+            # 检查大额交易（按时间排序；原地稳定排序一次后保持有序，相同时间的交易仍按加入顺序）
+            if not entry["large_sorted"]:
+                entry["large"].sort(key=lambda x: x["timestamp"])
+                entry["large_sorted"] = True
+            for tx in entry["large"]:
+                suspicious.append({
+                    "type": "large_amount_transaction",
+                    "transaction_id": tx["transaction_id"],
+                    "account": acc_id,
+                    "amount": tx["amount"],
+                    "timestamp": tx["timestamp"].isoformat() if isinstance(tx["timestamp"], datetime) else tx["timestamp"]
+                })
+
+        return suspicious
+
+    def detect_new_suspicious_patterns(self) -> List[Dict]:
+        """只检测上次增量检测以来有新交易的账户（返回这些账户的全部可疑模式），检测后清空待检测账户"""
+        dirty = self._dirty_accounts
+        self._dirty_accounts = {}
+        return self.detect_suspicious_patterns(dirty)
\ No newline at end of file
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+import mmap
+
+import pytest
+
+import run_processing
+
+TEXT = "第一行：中国工商银行 ICBC 转账５０００元。\r\n第二行：账户余额￥结束\r\n" * 3 + "last line without newline"
+
+
+@pytest.mark.parametrize("encoding", ["utf-8", "gbk"])
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 64, 1 << 20])
+def test_chunks_reassemble_text_across_boundaries(tmp_path, encoding, chunk_size):
+    """任意块大小下拼接结果与原文一致（换行统一为\\n）：跨块的多字节字符和 \\r\\n 不会被拆坏"""
+    path = tmp_path / f"{encoding}.txt"
+    path.write_bytes(TEXT.encode(encoding))
+    chunks = list(run_processing.chunk_large_file(str(path), chunk_size=chunk_size))
+    assert "".join(chunks) == TEXT.replace("\r\n", "\n")
+    assert all(chunks)
+    assert len(chunks) <= -(-path.stat().st_size // chunk_size)
+
+
+def test_chunks_without_mmap(tmp_path, monkeypatch):
+    """无法内存映射时退回逐块读取，结果相同"""
+    path = tmp_path / "utf8.txt"
+    path.write_bytes(TEXT.encode("utf-8"))
+    expected = list(run_processing.chunk_large_file(str(path), chunk_size=4))
+
+    def no_mmap(*args, **kwargs):
+        raise OSError("mmap not supported")
+    monkeypatch.setattr(mmap, "mmap", no_mmap)
+    assert list(run_processing.chunk_large_file(str(path), chunk_size=4)) == expected
+
+
+def test_empty_file_yields_nothing(tmp_path):
+    """空文件无法映射，也不产出任何块"""
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+    assert list(run_processing.chunk_large_file(str(path))) == []
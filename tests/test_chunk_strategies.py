@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from text_chunking import chunk_strategies
+from text_chunking.chunk_strategies import FixedWindowChunker, SemanticChunker
+
+ASCII_TEXT = ("The bank approved the transfer of 5,000 USD on 2023-01-02.  Customers asked about fees,\n"
+              "rates and limits; the branch replied within two days!\tNo further action was needed. ") * 6
+MIXED_TEXT = "中国工商银行于2023年1月2日向账户转账5000元。Citibank confirmed receipt. 客户表示满意。\n" * 6
+
+
+@pytest.fixture(scope="module")
+def byte_level_tokenizer():
+    """本地训练的字节级BPE分词器（与GPT-2相同的预分词、解码和偏移设置），无需下载模型"""
+    tokenizers = pytest.importorskip("tokenizers")
+    transformers = pytest.importorskip("transformers")
+    tokenizer = tokenizers.Tokenizer(tokenizers.models.BPE())
+    tokenizer.pre_tokenizer = tokenizers.pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tokenizer.decoder = tokenizers.decoders.ByteLevel()
+    tokenizer.post_processor = tokenizers.processors.ByteLevel(trim_offsets=False)
+    trainer = tokenizers.trainers.BpeTrainer(
+        vocab_size=400, initial_alphabet=tokenizers.pre_tokenizers.ByteLevel.alphabet())
+    tokenizer.train_from_iterator([ASCII_TEXT], trainer=trainer)
+    return transformers.GPT2TokenizerFast(tokenizer_object=tokenizer)
+
+
+@pytest.fixture
+def make_chunker(byte_level_tokenizer, monkeypatch):
+    monkeypatch.setattr(chunk_strategies, "_load_tokenizer", lambda model_name: byte_level_tokenizer)
+    return lambda max_tokens: SemanticChunker(max_tokens=max_tokens)
+
+
+def _decoded_chunks(tokenizer, text, max_tokens):
+    """改用字符偏移之前的分块方式：分词后逐块把token还原为字符串"""
+    tokens = tokenizer.tokenize(text)
+    return [tokenizer.convert_tokens_to_string(tokens[i:i + max_tokens])
+            for i in range(0, len(tokens), max_tokens)]
+
+
+@pytest.mark.parametrize("max_tokens", [1, 3, 7, 16, 10_000])
+def test_offset_chunks_match_decoded_chunks(make_chunker, byte_level_tokenizer, max_tokens):
+    """ASCII文本按字符偏移切出的分块与原来逐块解码的结果相同"""
+    chunks = make_chunker(max_tokens).chunk(ASCII_TEXT)
+    assert chunks == _decoded_chunks(byte_level_tokenizer, ASCII_TEXT, max_tokens)
+    assert "".join(chunks) == ASCII_TEXT
+
+
+@pytest.mark.parametrize("max_tokens", [1, 2, 5, 16])
+def test_offset_chunks_keep_multibyte_characters_whole(make_chunker, byte_level_tokenizer, max_tokens):
+    """汉字被拆成多个字节token时整字归入后一块：拼接还原原文，且不产生替换字符"""
+    chunks = make_chunker(max_tokens).chunk(MIXED_TEXT)
+    assert "".join(chunks) == MIXED_TEXT
+    assert all(chunks) and not any("\ufffd" in chunk for chunk in chunks)
+    # 逐块解码会在被拆开的汉字两侧留下替换字符
+    assert any("\ufffd" in chunk for chunk in _decoded_chunks(byte_level_tokenizer, MIXED_TEXT, 1))
+    assert len(chunks) <= len(_decoded_chunks(byte_level_tokenizer, MIXED_TEXT, max_tokens))
+
+
+def test_blank_text_yields_no_chunks(make_chunker):
+    """空白文本不产出分块"""
+    assert make_chunker(4).chunk(" \n\t") == []
+
+
+@pytest.mark.parametrize("chunk_size, overlap", [(10, 10), (10, 11), (1, 1)])
+def test_fixed_window_rejects_overlap_not_below_chunk_size(chunk_size, overlap):
+    """overlap 不小于 chunk_size 时在构造时报错，而不是分块时才因步长为0失败"""
+    with pytest.raises(ValueError, match="overlap必须小于chunk_size"):
+        FixedWindowChunker(chunk_size=chunk_size, overlap=overlap)
+
+
+def test_fixed_window_chunks():
+    """重叠量超过窗口一半时按一半截断，窗口按 chunk_size - overlap 的步长滑动"""
+    chunker = FixedWindowChunker(chunk_size=4, overlap=3)
+    assert chunker.overlap == 2
+    assert chunker.chunk("abcdefghij") == ["abcd", "cdef", "efgh", "ghij", "ij"]
+    assert list(chunker.chunk_iter("abcdefghij")) == chunker.chunk("abcdefghij")
+    assert FixedWindowChunker(chunk_size=3, overlap=0).chunk("abcdefg") == ["abc", "def", "g"]
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import json
+
+import run_processing
+
+
+def _process(tmp_path, name):
+    input_file = tmp_path / f"{name}.txt"
+    input_file.write_text("中国工商银行于2023年1月2日向账户6217001234567890转账5000元。\n\n联系电话13800138000。",
+                          encoding="utf-8")
+    output_dir = tmp_path / name
+    output_dir.mkdir()
+    run_processing.process_file(str(input_file), str(output_dir))
+    with open(output_dir / f"{name}_processed.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_default_output_keeps_records(tmp_path):
+    """默认输出的实体和关系仍是记录列表，不带格式版本"""
+    result = _process(tmp_path, "records")
+    assert "format_version" not in result
+    for chunk in result["processed_chunks"]:
+        assert isinstance(chunk["entities"], list)
+        assert isinstance(chunk["relations"], list)
+    assert sum(len(c["entities"]) for c in result["processed_chunks"]) == \
+        result["processing_summary"]["total_entities"]
+
+
+def test_columnar_output_is_opt_in_and_versioned(tmp_path, monkeypatch):
+    """开启列式输出后写入格式版本，列可以还原为与记录数相同的记录"""
+    monkeypatch.setattr(run_processing, "COLUMNAR_OUTPUT", True)
+    result = _process(tmp_path, "columnar")
+    assert result["format_version"] == run_processing.COLUMNAR_FORMAT_VERSION
+    entities = [e for c in result["processed_chunks"]
+                for e in run_processing._columns_to_records(c["entities"])]
+    assert entities
+    assert len(entities) == result["processing_summary"]["total_entities"]
+    assert all({"text", "type", "start", "end"} <= set(e) for e in entities)
+
+
+def test_records_to_columns_round_trip():
+    """字段相同的记录无损往返；字段不同的记录保持记录列表，不用None补齐"""
+    records = [{"text": "甲", "start": 0, "metadata": None}, {"text": "乙", "start": 3, "metadata": {"k": 1}}]
+    columns = run_processing._records_to_columns(records)
+    assert columns == {"text": ["甲", "乙"], "start": [0, 3], "metadata": [None, {"k": 1}]}
+    assert run_processing._columns_to_records(columns) == records
+
+    mixed = [{"text": "甲"}, {"text": "乙", "start": 3}]
+    assert run_processing._records_to_columns(mixed) is mixed
+    assert run_processing._columns_to_records(run_processing._records_to_columns(mixed)) == mixed
+    assert run_processing._records_to_columns([]) == {}
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from scenario_adaptation.compliance_mapper import ComplianceMapper
+
+HEADLINE = "第三章 金融机构客户身份识别、客户身份资料和交易记录保存管理办法及反洗钱与反恐怖融资内部控制制度实施细则与监督检查规程"
+
+
+@pytest.mark.parametrize("text, expected", [
+    (HEADLINE, True),
+    (HEADLINE + "\n", True),  # 首尾空白不影响判断
+    ("Chapter III Customer Due Diligence and Record Keeping Requirements for Banks", True),
+    ("第三条 金融机构应当建立客户身份识别制度\n并按规定保存客户身份资料和交易记录", False),  # 多行
+    ("金融机构应当按照规定建立健全反洗钱内部控制制度；", False),
+    ("金融机构应当履行以下反洗钱义务：", False),
+    ("Banks shall keep records; customers shall provide documents", False),
+    ("金融机构应当勤勉尽责，建立健全客户身份识别制度", False),
+    ("金融机构应当建立客户身份识别制度。", False),
+    ("长" * 200, False),  # 超过长度上限
+])
+def test_is_headline(text, expected):
+    """只有不含分句标点的单行短文本视为标题"""
+    assert ComplianceMapper._is_headline(text) is expected
+
+
+def test_only_non_headlines_are_summarized():
+    """标题原样作为摘要，分号、冒号结尾或多行的条款送入摘要模型，过短的文本不生成摘要"""
+    calls = []
+
+    def summarizer(texts, **kwargs):
+        calls.extend(texts)
+        return [{"summary_text": f"摘要{i}"} for i in range(len(texts))]
+
+    mapper = ComplianceMapper.__new__(ComplianceMapper)  # 不加载摘要模型
+    mapper.summarizer = summarizer
+    clause_semicolon = "金融机构应当按照规定建立健全反洗钱内部控制制度，并对分支机构和附属机构的执行情况定期进行监督检查和评估；"
+    clause_lines = "第三条 金融机构应当建立客户身份识别制度\n并按规定保存客户身份资料和交易记录不少于五年以备监管机构检查"
+    texts = [HEADLINE, clause_semicolon, "短文本", clause_lines]
+
+    summaries = mapper._generate_summaries(texts, batch_size=4)
+    assert summaries == [HEADLINE, "摘要0", None, "摘要1"]
+    assert calls == [clause_semicolon, clause_lines]
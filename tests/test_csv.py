@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+
+import run_processing
+
+
+def _write_csv(tmp_path, name, text, encoding="utf-8"):
+    path = tmp_path / name
+    path.write_bytes(text.encode(encoding))
+    return str(path)
+
+
+def test_csv_data_defaults_to_records(tmp_path):
+    """'data' 默认是逐行记录，columnar=True 时按列存储，两者逐行还原结果相同"""
+    path = _write_csv(tmp_path, "tx.csv", "AccountID,Amount,Note\nA1,100.5,工资\nA2,20,转账\n")
+    records = run_processing.process_csv_file(path)
+    assert records["data"] == pd.read_csv(path).to_dict(orient="records")
+    assert records["data"][0] == {"AccountID": "A1", "Amount": 100.5, "Note": "工资"}
+
+    columnar = run_processing.process_csv_file(path, columnar=True)
+    assert columnar["data"]["AccountID"] == ["A1", "A2"]
+    assert list(run_processing.iter_csv_records(columnar)) == list(run_processing.iter_csv_records(records))
+
+
+def test_sniff_separator_orders_candidates(tmp_path):
+    """嗅探到的分隔符排在候选列表首位，其余候选保持原顺序"""
+    path = _write_csv(tmp_path, "semi.csv", "账户;金额;备注\nA1;100;工资\nA2;200;转账\n")
+    seps = run_processing._sniff_csv_separators(path, "utf-8")
+    assert seps[0] == ";"
+    assert sorted(seps) == sorted(run_processing.CSV_SEPARATORS)
+
+    tab_path = _write_csv(tmp_path, "tab.csv", "a\tb\tc\n1\t2\t3\n4\t5\t6\n")
+    assert run_processing._sniff_csv_separators(tab_path, "utf-8")[0] == "\t"
+
+
+def test_sniff_separator_falls_back_to_default_order(tmp_path):
+    """样本无法判断分隔符（单列、空文件、文件不存在）时返回默认候选顺序"""
+    single = _write_csv(tmp_path, "single.csv", "name\nalice\nbob\n")
+    empty = _write_csv(tmp_path, "empty.csv", "")
+    for path in (single, empty, str(tmp_path / "missing.csv")):
+        assert run_processing._sniff_csv_separators(path, "utf-8") == list(run_processing.CSV_SEPARATORS)
+
+
+def test_sniff_separator_ignores_truncated_last_line(tmp_path, monkeypatch):
+    """样本被截断时丢弃最后一行残缺内容后再嗅探"""
+    monkeypatch.setattr(run_processing, "CSV_SNIFF_SIZE", 32)
+    path = _write_csv(tmp_path, "long.csv", "a|b|c\n1|2|3\n4|5|6\n7|8|9\n" + "x|y|z\n" * 20)
+    assert run_processing._sniff_csv_separators(path, "utf-8")[0] == "|"
+
+
+def test_process_csv_uses_sniffed_separator(tmp_path):
+    """分号分隔的文件按嗅探结果解析出正确的列"""
+    path = _write_csv(tmp_path, "semi.csv", "AccountID;Amount\nA1;100\nA2;200\n")
+    result = run_processing.process_csv_file(path)
+    assert result["metadata"]["separator"] == ";"
+    assert result["columns"] == ["AccountID", "Amount"]
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from config import CUSTOMER_SERVICE_CONFIG
+from scenario_adaptation import customer_service_generator as csg
+from scenario_adaptation.customer_service_generator import CustomerServiceGenerator
+
+SLOTS = {"bank": "花旗银行", "amount": "5000", "date": "2023年1月2日", "card": "6217 0012 3456 7890"}
+
+
+@pytest.mark.parametrize("template", [
+    *CUSTOMER_SERVICE_CONFIG["response_templates"].values(),
+    "{bank}{amount}",  # 相邻槽位，中间没有字面文本
+    "{{转义}}的括号{bank}}}",  # 转义括号
+    "",
+    "结尾是槽位{date}",
+])
+def test_pre_parsed_template_matches_format_map(template):
+    """预解析后拼接的结果与 format_map 相同"""
+    slots = {**SLOTS, "card_number": SLOTS["card"], "account_number": "A1", "balance": "100"}
+    assert csg._compile_template(template) is not None
+    assert csg._render_template(template, slots) == template.format_map(slots)
+
+
+@pytest.mark.parametrize("template", ["{amount:>8}", "{bank!r}", "{slots.bank}", "{0}", "{}", "{card[0]}"])
+def test_complex_templates_fall_back_to_format_map(template):
+    """含格式说明、转换符、属性/下标访问或位置参数的模板不预解析，渲染结果与 format_map 相同"""
+    assert csg._compile_template(template) is None
+    slots = {**SLOTS, "slots": type("S", (), {"bank": "汇丰银行"})(), "0": "零"}
+    try:
+        expected = template.format_map(slots)
+    except (IndexError, KeyError, ValueError) as e:
+        with pytest.raises(type(e)):
+            csg._render_template(template, slots)
+    else:
+        assert csg._render_template(template, slots) == expected
+
+
+def test_missing_slot_raises_key_error():
+    """缺少槽位时与 format_map 一样抛出 KeyError，由调用方改用默认回复"""
+    with pytest.raises(KeyError):
+        csg._render_template("余额{balance}", {})
+
+
+def test_generated_reply_fills_template():
+    """生成的助手回复按模板填充槽位，缺少槽位时使用默认回复"""
+    generator = CustomerServiceGenerator(CUSTOMER_SERVICE_CONFIG)
+    templates = CUSTOMER_SERVICE_CONFIG["response_templates"]
+
+    dialog = generator.generate_dialog({"text": "最近在花旗银行办理了业务，想了解一下。"})
+    assert dialog["intent"] == "bank_info"
+    assert dialog["dialog"][1]["content"] == templates["bank_info"].format_map(dialog["entities"])
+
+    reply = generator._build_assistant_turn("", "transaction_query", {"amount": "5000"})
+    assert reply["content"] == templates["other"]
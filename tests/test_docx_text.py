@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import os
+
+from docx import Document
+from docx.enum.text import WD_BREAK
+
+import run_processing
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _expected_paragraphs(file_path):
+    """python-docx 读取的非空段落文本"""
+    return [p.text.strip() for p in Document(file_path).paragraphs if p.text.strip()]
+
+
+def _actual(file_path):
+    data = run_processing.extract_text_from_docx(file_path)
+    paragraphs = [p['text'] for p in data['paragraphs']]
+    tables = [[cell['text'] for cell in row] for table in data['tables'] for row in table]
+    return paragraphs, tables
+
+
+def test_docx_text_matches_python_docx_on_sample():
+    """样例文档的段落文本与 paragraph.text 一致"""
+    path = os.path.join(PROJECT_ROOT, 'data', 'huaqi_info.docx')
+    paragraphs, _ = _actual(path)
+    assert paragraphs == _expected_paragraphs(path)
+    assert paragraphs
+
+
+def test_docx_text_keeps_tabs_and_breaks(tmp_path):
+    """制表符、换行和超链接中的文本与 python-docx 的 paragraph.text / cell.text 相同"""
+    doc = Document()
+    doc.add_paragraph('户名\t张三')
+    para = doc.add_paragraph('第一行')
+    para.runs[0].add_break()
+    para.add_run('第二行')
+    para.runs[-1].add_break(WD_BREAK.PAGE)
+    para.add_run('续')
+    cell = doc.add_table(rows=1, cols=2).cell(0, 1)
+    cell.text = '金额\t5000'
+    cell.add_paragraph('备注')
+    path = str(tmp_path / 'tabs.docx')
+    doc.save(path)
+
+    paragraphs, tables = _actual(path)
+    assert paragraphs == ['户名\t张三', '第一行\n第二行续']
+    assert paragraphs == _expected_paragraphs(path)
+    assert tables == [['', '金额\t5000\n备注']]
+    assert tables == [[c.text.strip() for c in row.cells] for t in Document(path).tables for row in t.rows]
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import os
+
+import run_processing
+
+GB_TEXT = "中国工商银行股份有限公司于二零二三年发布年度报告，营业收入稳步增长。\n" * 20
+
+
+def _write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_detect_utf8(tmp_path):
+    """UTF-8（含纯ASCII）由严格解码直接判定"""
+    assert run_processing.detect_file_encoding(_write(tmp_path, "u.txt", GB_TEXT.encode("utf-8"))) == "utf-8"
+    assert run_processing.detect_file_encoding(_write(tmp_path, "a.txt", b"plain ascii\n")) == "utf-8"
+
+
+def test_detect_utf8_with_char_split_at_sample_end(tmp_path, monkeypatch):
+    """样本末尾截断的多字节字符不影响UTF-8判定"""
+    data = GB_TEXT.encode("utf-8")
+    monkeypatch.setattr(run_processing, "ENCODING_SAMPLE_SIZE", 10)  # 切在第4个汉字中间
+    assert run_processing.detect_file_encoding(_write(tmp_path, "split.txt", data)) == "utf-8"
+
+
+def test_detect_gb_text(tmp_path):
+    """GBK 编码的中文文本检测结果能正确解码原文（GB2312/GBK 统一为 gb18030）"""
+    path = _write(tmp_path, "gb.txt", GB_TEXT.encode("gbk"))
+    encoding = run_processing.detect_file_encoding(path)
+    assert encoding not in ("utf-8", "iso-8859-1")
+    with open(path, encoding=encoding) as f:
+        assert f.read() == GB_TEXT
+
+
+def test_detect_gb_text_without_detector(tmp_path, monkeypatch):
+    """没有编码检测库时逐一尝试解码"""
+    monkeypatch.setattr(run_processing, "HAS_CHARSET_DETECTOR", False)
+    assert run_processing.detect_file_encoding(_write(tmp_path, "gb.txt", GB_TEXT.encode("gbk"))) == "gbk"
+    assert run_processing.detect_file_encoding(_write(tmp_path, "bin.txt", bytes([0x81, 0x20]))) == "iso-8859-1"
+
+
+def test_detection_follows_file_changes(tmp_path):
+    """检测结果按 (路径, 修改时间, 大小) 缓存，文件内容变化后重新检测"""
+    path = _write(tmp_path, "f.txt", b"ascii only\n")
+    assert run_processing.detect_file_encoding(path) == "utf-8"
+    _write(tmp_path, "f.txt", GB_TEXT.encode("gbk"))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert run_processing.detect_file_encoding(path) != "utf-8"
+
+
+def test_detect_bom(tmp_path):
+    """带BOM的文件由BOM确定编码，utf-8-sig 读取时BOM不会混入首个列名"""
+    path = _write(tmp_path, "bom.csv", b"\xef\xbb\xbf" + "账户,金额\nA1,100\n".encode("utf-8"))
+    assert run_processing.detect_file_encoding(path) == "utf-8-sig"
+    assert run_processing.process_csv_file(path)["columns"] == ["账户", "金额"]
+
+    for bom_encoding in ("utf-16-le", "utf-16-be"):
+        bom = "\ufeff".encode(bom_encoding)
+        path = _write(tmp_path, f"{bom_encoding}.txt", bom + GB_TEXT.encode(bom_encoding))
+        assert run_processing.detect_file_encoding(path) == "utf-16"
+        with open(path, encoding="utf-16") as f:
+            assert f.read() == GB_TEXT
+
+
+def test_detect_gb18030_text(tmp_path):
+    """GB18030 编码（含GBK之外的字符）的文本检测结果能正确解码原文"""
+    text = GB_TEXT + "䶮€\n"
+    path = _write(tmp_path, "gb18030.txt", text.encode("gb18030"))
+    encoding = run_processing.detect_file_encoding(path)
+    with open(path, encoding=encoding) as f:
+        assert f.read() == text
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from information_extraction.schemas import Entity, ProcessedChunk
+from scenario_adaptation import fraud_encoder
+from scenario_adaptation.fraud_encoder import FraudEncoder
+
+
+def _mixed_tz_df():
+    return pd.DataFrame({
+        'AccountID': ['a', 'a', 'b'],
+        'TransactionAmount': [5000, 20, 3000],
+        'TransactionDate': ['2024-01-01 10:00:00+08:00', '2024-01-01 03:00:00', '2024/01/02 09:00'],
+    })
+
+
+def test_mixed_timezones_batch_matches_rows():
+    """带时区与不带时区的时间混在同一批中时整批都被记录，结果与逐行处理一致"""
+    df = _mixed_tz_df()
+    batch = FraudEncoder()
+    stats = batch.add_transactions_df(df)
+
+    rows = FraudEncoder()
+    for _, row in df.iterrows():
+        rows.add_transaction_chunk(row)
+
+    assert stats['processed_rows'] == 3
+    assert stats['transactions_count'] == 3
+    assert stats['edges_added'] == 3
+    expected = [pd.Timestamp('2024-01-01 02:00:00'), pd.Timestamp('2024-01-01 03:00:00'),
+                pd.Timestamp('2024-01-02 09:00:00')]
+    assert [tx['timestamp'] for tx in batch.transactions] == expected
+    assert [tx['timestamp'] for tx in rows.transactions] == expected
+    assert batch.nodes == rows.nodes
+    assert batch._account_index['a']['first'] == expected[0]
+
+
+def test_timestamps_without_mixed_format(monkeypatch):
+    """pandas 不支持 format='mixed' 时逐个解析，结果相同"""
+    values = _mixed_tz_df()['TransactionDate']
+    expected = FraudEncoder._column_timestamps(values)
+    monkeypatch.setattr(fraud_encoder, 'PANDAS_MIXED_FORMAT', False)
+    assert FraudEncoder._column_timestamps(values) == expected
+
+
+def _transactions_df():
+    return pd.DataFrame({
+        'AccountID': ['A1', 'A2', 'A1', 'A1', 'A3', 'A2'],
+        'TransactionAmount': [5000, 20, 1500, 30, 999, 'bad'],
+        'TransactionDate': ['2024-01-01 10:00:00', '2024-01-01 10:05:00', '2024-01-01 09:58:00',
+                            '2024-01-01 10:01:00', '2024-01-02 08:00:00', '2024-01-01 10:05:00'],
+        'TransactionType': ['Debit', 'Credit', 'Debit', 'Debit', 'Credit', 'Debit'],
+        'Location': ['上海', '北京', '上海', '上海', '深圳', '北京'],
+        'DeviceID': ['D1', 'D2', 'D1', 'D1', 'D3', 'D2'],
+    })
+
+
+def _text_chunk(accounts, transfers):
+    """带账户实体和转账关系的文本块（关系对象按旧版接口提供 relation_type）"""
+    entities = [Entity(id=f"e{i}", text=acc, type="ACCOUNT", start=0, end=len(acc))
+                for i, acc in enumerate(accounts)]
+    relations = [SimpleNamespace(relation_type="TRANSFER_TO",
+                                 source=SimpleNamespace(text=src), target=SimpleNamespace(text=dst))
+                 for src, dst in transfers]
+    return ProcessedChunk(chunk_id=1, original_text="转账记录", entities=entities, relations=relations)
+
+
+class _NetworkxGraphReference:
+    """改用 dict 邻接表之前基于 networkx.MultiDiGraph 的建图逻辑"""
+
+    def __init__(self, nx):
+        self.graph = nx.MultiDiGraph()
+
+    def add_row(self, row):
+        source_acc = str(row.get('AccountID', ''))
+        try:
+            amount = float(row.get('TransactionAmount', 0))
+        except (ValueError, TypeError):
+            amount = 0
+        timestamp = pd.to_datetime(row.get('TransactionDate'))
+        if not self.graph.has_node(source_acc):
+            self.graph.add_node(source_acc, node_type="account", last_activity=timestamp.isoformat())
+        tx_id = f"tx_{source_acc}_{timestamp.timestamp()}"
+        self.graph.add_node(tx_id, node_type="transaction", amount=amount, timestamp=timestamp.isoformat(),
+                            transaction_type=row.get('TransactionType', ''),
+                            location=row.get('Location', ''), device_id=row.get('DeviceID', ''))
+        self.graph.add_edge(source_acc, tx_id, relation_type="initiated")
+
+    def add_chunk(self, chunk, index):
+        for acc in {e.text for e in chunk.entities if e.label == "ACCOUNT"}:
+            if not self.graph.has_node(acc):
+                self.graph.add_node(acc, node_type="account", last_activity="now")
+        for k, rel in enumerate(chunk.relations):
+            tx_id = f"tx_{rel.source.text}_{rel.target.text}_{index}_{k}"
+            self.graph.add_node(tx_id, node_type="transaction", timestamp="now")
+            self.graph.add_edge(rel.source.text, tx_id, relation_type="initiated")
+            self.graph.add_edge(tx_id, rel.target.text, relation_type="sent_to")
+
+
+def _canonical(nodes, edges):
+    """文本转账的交易节点ID和时间戳取决于实现和当前时间，按加入顺序编号并去掉时间字段后比较"""
+    names = {}
+    transfers = 0
+    for node_id, attrs in nodes:
+        if attrs.get("node_type") == "transaction" and "amount" not in attrs:
+            names[node_id] = ("transfer", transfers)
+            transfers += 1
+        else:
+            names[node_id] = node_id
+    canon_nodes = sorted(
+        (str(names[n]), sorted((k, str(v)) for k, v in attrs.items()
+                               if not (k in ("timestamp", "last_activity") and v == "now")))
+        for n, attrs in nodes
+    )
+    canon_edges = sorted((str(names[s]), str(names[t]), rel) for s, t, rel in edges)
+    return canon_nodes, canon_edges
+
+
+def test_dict_graph_matches_networkx_reference():
+    """dict 邻接表建出的图与原 networkx 多重有向图的节点、属性、边和计数一致"""
+    nx = pytest.importorskip("networkx")
+    reference = _NetworkxGraphReference(nx)
+    encoder = FraudEncoder()
+
+    for _, row in _transactions_df().iterrows():
+        reference.add_row(row)
+        output = encoder.add_transaction_chunk(row)
+        assert (output["nodes_count"], output["edges_count"]) == \
+            (reference.graph.number_of_nodes(), reference.graph.number_of_edges())
+
+    chunks = [
+        _text_chunk(["A1", "B1"], [("A1", "B1"), ("B1", "C9")]),  # C9 只作为转账目标出现，以空属性建节点
+        _text_chunk(["B2"], [("A1", "B1")]),  # 同一对账户的第二笔转账是另一条平行边
+        _text_chunk([], []),
+    ]
+    for i, chunk in enumerate(chunks):
+        reference.add_chunk(chunk, i)
+        output = encoder.add_transaction_chunk(chunk)
+        assert (output["nodes_count"], output["edges_count"]) == \
+            (reference.graph.number_of_nodes(), reference.graph.number_of_edges())
+
+    # 文本块中账户节点的最近活动时间取当前时间，与参考实现一样统一记为 "now"
+    snapshot = encoder.snapshot()
+    nodes = [(n, {k: ("now" if k == "last_activity" and n in ("B1", "B2") or
+                      k == "timestamp" and isinstance(n, int) else v)
+                  for k, v in attrs.items()})
+             for n, attrs in snapshot["nodes"]]
+    edges = [(e["source"], e["target"], e["relation_type"]) for e in snapshot["edges"]]
+    expected_edges = [(s, t, d["relation_type"]) for s, t, d in reference.graph.edges(data=True)]
+    assert _canonical(nodes, edges) == _canonical(list(reference.graph.nodes(data=True)), expected_edges)
+
+    # 账户节点的出边/入边索引与参考图的出度/入度一致
+    for node_id in reference.graph.nodes:
+        if node_id in encoder.nodes:
+            assert len(encoder.out_edges.get(node_id, ())) == reference.graph.out_degree(node_id)
+            assert len(encoder.in_edges.get(node_id, ())) == reference.graph.in_degree(node_id)
+
+
+def _reference_detect(transactions, window_minutes=15):
+    """改为按账户增量索引之前的检测逻辑：每次检测时重新分组、排序全部交易"""
+    suspicious = []
+    account_transactions = {}
+    for tx in transactions:
+        account_transactions.setdefault(tx["account_id"], []).append(tx)
+    for acc_id, txs in account_transactions.items():
+        txs.sort(key=lambda x: x["timestamp"])
+        if len(txs) >= 3:
+            time_diff = (txs[-1]["timestamp"] - txs[0]["timestamp"]).total_seconds() / 60
+            if time_diff < window_minutes:
+                suspicious.append({
+                    "type": "high_frequency_transfer",
+                    "account": acc_id,
+                    "transaction_count": len(txs),
+                    "time_range": f"{txs[0]['timestamp']} - {txs[-1]['timestamp']}"
+                })
+        for tx in txs:
+            if tx["amount"] > 1000:
+                suspicious.append({
+                    "type": "large_amount_transaction",
+                    "transaction_id": tx["transaction_id"],
+                    "account": acc_id,
+                    "amount": tx["amount"],
+                    "timestamp": tx["timestamp"].isoformat() if isinstance(tx["timestamp"], datetime) else tx["timestamp"]
+                })
+    return suspicious
+
+
+def test_incremental_detection_matches_full_rescan():
+    """增量维护的账户索引与每次全量重新分组排序的检测结果一致（含乱序到达和相同时间的交易）"""
+    df = _transactions_df()
+    late = pd.DataFrame({
+        'AccountID': ['A2', 'A2', 'A1', 'A4'],
+        'TransactionAmount': [2000, 3000, 8000, 50],
+        'TransactionDate': ['2024-01-01 10:07:00', '2024-01-01 09:59:00', '2024-01-01 09:58:00', None],
+    })
+    encoder = FraudEncoder()
+    for _, row in df.iterrows():
+        encoder.add_transaction_chunk(row)
+    assert encoder.detect_suspicious_patterns() == _reference_detect(encoder.transactions)
+
+    # 检测之后继续乱序加入交易，已排序的大额交易列表需要重新排序
+    encoder.add_transactions_df(late)
+    assert encoder.detect_suspicious_patterns() == _reference_detect(encoder.transactions)
+    assert encoder.detect_suspicious_patterns() == _reference_detect(encoder.transactions)
+
+    # 按账户检测与全量结果中这些账户的部分一致
+    full = _reference_detect(encoder.transactions)
+    assert encoder.detect_suspicious_patterns(["A2"]) == [item for item in full if item["account"] == "A2"]
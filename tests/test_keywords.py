@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+from run_processing import extract_advanced_keywords
+
+
+def test_category_patterns_return_non_overlapping_matches():
+    """同一类别的模式合并扫描：与先出现的匹配重叠的其他模式匹配不再返回"""
+    # 单独扫描第二个电话模式还会匹配到与第一个匹配重叠的 '115871484-1858'
+    keywords = extract_advanced_keywords("电话7115871484-18583", ["phones"])
+    assert keywords["phones"] == ["7115871484"]
+
+
+def test_category_matches_follow_text_order():
+    """结果按文本中出现的顺序排列，而不是按模式顺序"""
+    # '2023年1月2日' 由第二个日期模式匹配，但在文本中先出现
+    keywords = extract_advanced_keywords("2023年1月2日签约，2023/01/05生效", ["dates"])
+    assert keywords["dates"] == ["2023年1月2日", "2023/01/05"]
+
+
+def test_identical_values_are_deduplicated():
+    """多个模式都能匹配的同一数值只返回一次"""
+    keywords = extract_advanced_keywords("卡号621700123456和622848123456", ["phones"])
+    assert keywords["phones"] == ["621700123456", "622848123456"]
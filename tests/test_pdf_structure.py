@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+
+import run_processing
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+def test_pdf_structure_matches_baseline():
+    """PDF文本保留段落间的空行，文档结构与基线结果一致"""
+    result = run_processing.process_pdf_file(os.path.join(PROJECT_ROOT, "data", "tencent_info.pdf"))
+    with open(os.path.join(DATA_DIR, "tencent_info_structure.json"), encoding="utf-8") as f:
+        expected = json.load(f)
+
+    structure = result["structure"]
+    assert len(structure["paragraphs"]) == 65
+    assert len(structure["lists"]) == 2
+    for key in ("paragraphs", "sections", "lists", "tables"):
+        assert structure[key] == expected[key], key
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import logging
+import multiprocessing
+import os
+
+import run_processing
+
+
+def test_spawn_workers_keep_parent_log(tmp_path, monkeypatch):
+    """spawn 启动的子进程不会截断父进程的日志文件，且子进程日志追加到同一文件"""
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    paths = []
+    for i in range(2):
+        path = input_dir / f"doc_{i}.txt"
+        path.write_text(f"中国工商银行于2023年1月{i + 1}日发布公告。\n\n第二段内容。", encoding="utf-8")
+        paths.append(str(path))
+
+    # 在临时目录中运行，子进程若重新配置日志会截断的正是这里的 processing.log
+    monkeypatch.chdir(tmp_path)
+    log_file = tmp_path / run_processing.LOG_FILE
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    handler = logging.FileHandler(log_file, mode="w", encoding="utf-8")
+    root.handlers = [handler]
+    root.setLevel(logging.INFO)
+    try:
+        logging.getLogger("test").info("父进程标记行")
+        handler.flush()
+        results = list(run_processing.process_files(
+            paths, str(output_dir), max_workers=2,
+            mp_context=multiprocessing.get_context("spawn")))
+    finally:
+        root.handlers = saved_handlers
+        root.setLevel(saved_level)
+        handler.close()
+
+    assert len(results) == 2
+    assert not any('error' in result for result in results)
+    log_text = log_file.read_text(encoding="utf-8")
+    assert "父进程标记行" in log_text
+    assert "文件处理完成: doc_0.txt" in log_text
+    assert "文件处理完成: doc_1.txt" in log_text
+
+
+def test_duplicate_files_processed_once(tmp_path, monkeypatch):
+    """内容相同的文件在父进程去重：只处理一次，但每个文件都写出自己的结果"""
+    input_dir = tmp_path / "input"
+    output_dir = tmp_path / "output"
+    input_dir.mkdir()
+    output_dir.mkdir()
+    contents = {
+        "a.txt": "甲方于2023年1月2日签约。",
+        "b.txt": "甲方于2023年1月2日签约。",
+        "c.txt": "乙方于2023年1月3日签约。",  # 与 a/b 大小相同但内容不同
+        "d.txt": "另一份长度不同的合同文本内容。",
+    }
+    paths = []
+    for name, text in contents.items():
+        path = input_dir / name
+        path.write_text(text, encoding="utf-8")
+        paths.append(str(path))
+    sizes = [os.path.getsize(p) for p in paths]
+
+    hashed = []
+    original_hash = run_processing._file_content_hash
+    monkeypatch.setattr(run_processing, "_file_content_hash",
+                        lambda p: hashed.append(os.path.basename(p)) or original_hash(p))
+    analyzed = []
+    original_analyze = run_processing._analyze_document
+    monkeypatch.setattr(run_processing, "_analyze_document",
+                        lambda p, info: analyzed.append(info["name"]) or original_analyze(p, info))
+
+    results = list(run_processing.process_files(paths, str(output_dir), sizes, max_workers=1))
+
+    # 只有大小冲突的文件才计算指纹，内容相同的文件只分析一次
+    assert sorted(hashed) == ["a.txt", "b.txt", "c.txt"]
+    assert sorted(analyzed) == ["a.txt", "c.txt", "d.txt"]
+    assert sorted(r["file_info"]["name"] for r in results) == sorted(contents)
+    reused = next(r for r in results if r["file_info"]["name"] == "b.txt")
+    assert reused["file_info"]["path"] == paths[1]
+    for name in contents:
+        assert (output_dir / f"{os.path.splitext(name)[0]}_processed.json").exists()
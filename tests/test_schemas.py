@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from config import CUSTOMER_SERVICE_CONFIG
+from information_extraction.schemas import Entity, ProcessedChunk
+from scenario_adaptation.customer_service_generator import CustomerServiceGenerator
+from scenario_adaptation.fraud_encoder import FraudEncoder
+
+
+def _entity(i, text, label):
+    return Entity(id=f"e{i}", text=text, type=label, start=0, end=len(text))
+
+
+def test_label_views_follow_entity_changes():
+    """label_set / entities_by_label 在 entities 追加或重新赋值后随之变化"""
+    chunk = ProcessedChunk(chunk_id=1, original_text="", entities=[_entity(1, "花旗银行", "BANK")], relations=[])
+    assert chunk.label_set == frozenset({"BANK"})
+
+    chunk.entities.append(_entity(2, "6217001234567890", "ACCOUNT"))
+    assert chunk.label_set == frozenset({"BANK", "ACCOUNT"})
+    assert [e.text for e in chunk.entities_by_label["ACCOUNT"]] == ["6217001234567890"]
+
+    chunk.entities = [_entity(3, "6222020200112233", "ACCOUNT")]
+    assert chunk.label_set == frozenset({"ACCOUNT"})
+    assert list(chunk.entities_by_label) == ["ACCOUNT"]
+
+
+def test_consumers_see_current_entities():
+    """意图检测和欺诈编码器读取的是修改后的实体"""
+    chunk = ProcessedChunk(chunk_id=1, original_text="", entities=[_entity(1, "花旗银行", "BANK")], relations=[])
+    generator = CustomerServiceGenerator(CUSTOMER_SERVICE_CONFIG)
+    assert generator._detect_intent(chunk) == "bank_info"
+
+    chunk.entities = [_entity(2, "6217001234567890", "ACCOUNT")]
+    assert generator._detect_intent(chunk) == "account_management"
+
+    encoder = FraudEncoder()
+    encoder.add_transaction_chunk(chunk)
+    assert "6217001234567890" in encoder.nodes
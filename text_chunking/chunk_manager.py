@@ -5,6 +5,8 @@ from typing import List, Dict, Type, Optional
 import re
 import logging
 
+_PARAGRAPH_SPLIT_RE = re.compile(r'\n\s*\n')  # 段落分隔（空行，可含空白字符）
+
 class ChunkManager:
     """文本分块管理器，用于将长文本分割成适当大小的块"""
     
@@ -20,7 +22,7 @@ class ChunkManager:
                 return []
             
             # 按段落分割
-            paragraphs = [p.strip() for p in re.split(r'\n\s*\n', text) if p.strip()]
+            paragraphs = [p.strip() for p in _PARAGRAPH_SPLIT_RE.split(text) if p.strip()]
             
             chunks = []
             current_chunk = []
@@ -58,6 +60,7 @@ class ChunkManager:
         if not isinstance(text, str):
             raise TypeError(f"需要字符串输入，得到 {type(text).__name__}")
         try:
-            return [chunk for chunk in self.strategy.chunk(text) if chunk.strip()]
+            # 逐个过滤策略产出的分块，不先构建完整的中间列表
+            return [chunk for chunk in self.strategy.chunk_iter(text) if chunk.strip()]
         except Exception as e:
             raise ChunkingError(e) from e
\ No newline at end of file
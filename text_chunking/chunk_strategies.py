@@ -1,11 +1,31 @@
 # chunk_strategies.py
 from abc import ABC, abstractmethod
-from typing import List, Optional, Pattern
+from typing import Iterator, List, Optional, Pattern
+import functools
 import re
 import logging
-from transformers import GPT2TokenizerFast
 from .exceptions import ChunkingError
 
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?。！？])\s+')  # 句末标点后的空白
+TOKENIZER_CACHE_SIZE = 4  # 进程内缓存的分词器数量（按模型名）
+
+
+@functools.lru_cache(maxsize=TOKENIZER_CACHE_SIZE)
+def _load_tokenizer(model_name: str):
+    """加载分词器（按模型名缓存，多个 SemanticChunker 共用同一实例）"""
+    # transformers 导入开销大，只在使用语义分块时导入
+    from transformers import GPT2TokenizerFast
+    return GPT2TokenizerFast.from_pretrained(model_name)
+
+
+def _iter_sentences(text: str) -> Iterator[str]:
+    """按句末标点后的空白逐句产出（与 _SENTENCE_SPLIT_RE.split 结果相同，不构建中间列表）"""
+    start = 0
+    for match in _SENTENCE_SPLIT_RE.finditer(text):
+        yield text[start:match.start()]
+        start = match.end()
+    yield text[start:]
+
 
 class ChunkStrategy(ABC):
     """分块策略抽象基类"""
@@ -14,6 +34,10 @@ class ChunkStrategy(ABC):
     def chunk(self, text: str) -> List[str]:
         pass
 
+    def chunk_iter(self, text: str) -> Iterator[str]:
+        """逐个产出分块结果；默认基于 chunk()，可独立生成分块的策略可改为按需生成以避免构建完整列表"""
+        return iter(self.chunk(text))
+
 
 class FixedWindowChunker(ChunkStrategy):
     """固定窗口分块（按字符长度分割，允许重叠）"""
@@ -21,6 +45,8 @@ class FixedWindowChunker(ChunkStrategy):
     def __init__(self, chunk_size: int = 512, overlap: int = 50):
         if chunk_size <= 0 or overlap < 0:
             raise ValueError("chunk_size必须大于0，overlap必须非负")
+        if overlap >= chunk_size:
+            raise ValueError(f"overlap必须小于chunk_size（overlap={overlap}, chunk_size={chunk_size}）")
         self.chunk_size = chunk_size
         self.overlap = min(overlap, chunk_size // 2)  # 限制最大重叠量
 
@@ -28,14 +54,15 @@ class FixedWindowChunker(ChunkStrategy):
         """实现固定窗口分块逻辑"""
         if not text.strip():
             return []
+        size = self.chunk_size
+        return [text[start:start + size] for start in range(0, len(text), size - self.overlap)]
 
-        chunks = []
-        start = 0
-        while start < len(text):
-            end = start + self.chunk_size
-            chunks.append(text[start:end])
-            start += (self.chunk_size - self.overlap)
-        return chunks
+    def chunk_iter(self, text: str) -> Iterator[str]:
+        """按窗口逐个产出分块"""
+        if not text.strip():
+            return iter(())
+        size = self.chunk_size
+        return (text[start:start + size] for start in range(0, len(text), size - self.overlap))
 
 
 class SemanticChunker(ChunkStrategy):
@@ -43,7 +70,7 @@ class SemanticChunker(ChunkStrategy):
 
     def __init__(self, model_name: str = "gpt2", max_tokens: int = 512):
         try:
-            self.tokenizer = GPT2TokenizerFast.from_pretrained(model_name)
+            self.tokenizer = _load_tokenizer(model_name)
         except ImportError:
             raise ImportError("请先安装transformers库：pip install transformers")
         except Exception as e:
@@ -52,16 +79,21 @@ class SemanticChunker(ChunkStrategy):
 
     def chunk(self, text: str) -> List[str]:
         """使用分词器分割文本"""
+        return list(self.chunk_iter(text))
+
+    def chunk_iter(self, text: str) -> Iterator[str]:
+        """分词后按 max_tokens 逐个产出分块"""
         if not text.strip():
-            return []
+            return
 
         try:
-            tokens = self.tokenizer.tokenize(text)
-            chunks = []
-            for i in range(0, len(tokens), self.max_tokens):
-                chunk_tokens = tokens[i:i + self.max_tokens]
-                chunks.append(self.tokenizer.convert_tokens_to_string(chunk_tokens))
-            return chunks
+            # 用快速分词器的字符偏移直接切分原文，无需逐块把token还原为字符串；
+            # 每块从首个token的起点切到下一块的起点，被拆成多个字节token的汉字完整归入后一块
+            offsets = self.tokenizer.backend_tokenizer.encode(text, add_special_tokens=False).offsets
+            starts = [offsets[i][0] for i in range(0, len(offsets), self.max_tokens)]
+            for start, end in zip(starts, starts[1:] + [len(text)]):
+                if end > start:
+                    yield text[start:end]
         except Exception as e:
             raise ChunkingError(f"语义分块失败: {str(e)}")
 
@@ -89,6 +121,9 @@ class StructureAwareChunker(ChunkStrategy):
         ]
         # 优化段落识别
         self.paragraph_pattern = r'(?:^|\n)(.+?)(?:\n\s*\n|$)'
+        # 结构模式合并为一个正则并预编译，分块时不再重复拼接和查找编译缓存
+        self._structure_re = re.compile('|'.join(self.section_patterns), re.MULTILINE | re.DOTALL)
+        self._paragraph_re = re.compile(self.paragraph_pattern, re.MULTILINE | re.DOTALL)
         
     def chunk(self, text: str) -> List[str]:
         """实现结构感知分块逻辑"""
@@ -121,11 +156,8 @@ class StructureAwareChunker(ChunkStrategy):
         
     def _split_by_structure(self, text: str) -> List[str]:
         """按文档结构分割文本"""
-        # 合并所有结构模式
-        combined_pattern = '|'.join(self.section_patterns)
-        
         # 找到所有结构边界
-        matches = list(re.finditer(combined_pattern, text, re.MULTILINE | re.DOTALL))
+        matches = list(self._structure_re.finditer(text))
         
         if not matches:
             # 如果没有找到结构边界，按段落分割
@@ -159,18 +191,16 @@ class StructureAwareChunker(ChunkStrategy):
         
     def _split_by_paragraphs(self, text: str) -> List[str]:
         """按段落分割文本"""
-        paragraphs = re.findall(self.paragraph_pattern, text, re.MULTILINE | re.DOTALL)
+        paragraphs = self._paragraph_re.findall(text)
         return [p.strip() for p in paragraphs if p.strip()]
         
     def _split_large_section(self, section: str) -> List[str]:
         """分割大型段落"""
-        # 首先尝试按句子分割
-        sentences = re.split(r'(?<=[.!?。！？])\s+', section)
-        
+        # 首先尝试按句子分割（逐句处理）
         chunks = []
         current_chunk = ""
         
-        for sentence in sentences:
+        for sentence in _iter_sentences(section):
             # 如果当前句子本身就超过最大块大小，直接添加为一个块
             if len(sentence) > self.max_chunk_size:
                 if current_chunk:
@@ -204,17 +234,23 @@ class StructureAwareChunker(ChunkStrategy):
         enhanced_chunks = []
         overlap_size = min(50, self.min_chunk_size // 2)
         
+        last = len(chunks) - 1
         for i, chunk in enumerate(chunks):
+            # 各部分收集后一次拼接，避免前后文各生成一份中间字符串
+            parts = []
             # 添加前一个块的结尾作为上下文
             if i > 0:
-                prev_context = chunks[i-1][-overlap_size:] if len(chunks[i-1]) > overlap_size else chunks[i-1]
-                chunk = f"[前文] {prev_context}\n\n{chunk}"
-                
+                prev_chunk = chunks[i-1]
+                prev_context = prev_chunk[-overlap_size:] if len(prev_chunk) > overlap_size else prev_chunk
+                parts += ("[前文] ", prev_context, "\n\n")
+            parts.append(chunk)
+
             # 添加后一个块的开头作为上下文
-            if i < len(chunks) - 1:
-                next_context = chunks[i+1][:overlap_size] if len(chunks[i+1]) > overlap_size else chunks[i+1]
-                chunk = f"{chunk}\n\n[后文] {next_context}"
-                
-            enhanced_chunks.append(chunk)
+            if i < last:
+                next_chunk = chunks[i+1]
+                next_context = next_chunk[:overlap_size] if len(next_chunk) > overlap_size else next_chunk
+                parts += ("\n\n[后文] ", next_context)
+
+            enhanced_chunks.append("".join(parts))
             
         return enhanced_chunks
\ No newline at end of file